@@ -1,35 +1,39 @@
-from llm import llm
-from graph import graph
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
-from langchain.tools import Tool
-from langchain_neo4j import Neo4jChatMessageHistory
-from langchain.agents import initialize_agent, AgentType
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from tools.vector import get_game_info
-from tools.cypher import cypher_qa
+import importlib
+import itertools
+import logging
+import queue
+import threading
+import time
+from types import SimpleNamespace
+import streamlit as st
+from streaming import AgentStreamHandler
+from startup import LazyResource, lazy, warm_up
+from tracing import trace, traced
 from utils import get_session_id
 
+logger = logging.getLogger(__name__)
+
+# Araç modülleri ilk kullanımda içe aktarılır (Neo4j / OpenAI bağlantıları orada kuruluyor)
+vector_tool = LazyResource("game search tool", lambda: importlib.import_module("tools.vector"))
+cypher_tool = LazyResource("graph info tool", lambda: importlib.import_module("tools.cypher"))
+
 # Genel sohbet prompt'u
-chat_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system",
-         "You are NextLevelBot, an intelligent assistant that helps users explore and discover video games. "
-         "You understand the relationships between games, genres, user play patterns, and descriptions. "
-         "Use concise language and answer based on the knowledge graph structure (nodes and relationships)."),
-        ("human", "{input}"),
-    ]
+CHAT_SYSTEM_PROMPT = (
+    "You are NextLevelBot, an intelligent assistant that helps users explore and discover video games. "
+    "You understand the relationships between games, genres, user play patterns, and descriptions. "
+    "Use concise language and answer based on the knowledge graph structure (nodes and relationships)."
 )
-game_chat = chat_prompt | llm | StrOutputParser()
+
+
+def get_game_info(user_input):
+    return vector_tool().get_game_info(user_input)
 
 
 def enhanced_cypher_qa(query):
     try:
-        result = cypher_qa.invoke({"query": query})
+        result = cypher_tool().answer_graph_question(query)
 
-        # Debug için result'u print edelim
-        print(f"DEBUG - Raw result: {result}")
-        print(f"DEBUG - Result type: {type(result)}")
+        logger.debug("graph info result (%s): %s", type(result).__name__, result)
 
         # Eğer result dict ise
         if isinstance(result, dict):
@@ -61,112 +65,323 @@ def enhanced_cypher_qa(query):
     except Exception as e:
         return f"Error executing database query: {str(e)}"
 
-# Araçlar
-tools = [
-    Tool.from_function(
-        name="General Chat",
-        description="For general game-related conversation or follow-ups",
-        func=game_chat.invoke,
-    ),
-    Tool.from_function(
-        name="Game Search",
-        description="Use this tool to find video games based on their descriptions, tags, developers, or platforms.",
-        func=get_game_info,
-    ),
-    Tool.from_function(
-        name="Graph Info",
-        description="Use this for database queries about users, games, or friendships.",
-        func=cypher_qa,
+
+@lazy("agent")
+def get_agent():
+    """Agent, hafıza, yönlendirici ve planlayıcı; ilk kullanımda bir kez kurulur"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain.schema import StrOutputParser
+    from langchain.tools import Tool
+    from langchain.agents import AgentExecutor
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from llm import get_llm, get_embeddings
+    from graph import get_graph
+    from router import IntentRouter
+    from planner import ParallelPlanner
+    from history_writer import HistoryWriter
+    from db import get_driver, get_database
+    from agent_prompt import AGENT_FORMAT_INSTRUCTIONS, AGENT_PREFIX, AGENT_SUFFIX, BudgetedReActAgent
+
+    llm, embeddings, graph = get_llm(), get_embeddings(), get_graph()
+
+    chat_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", CHAT_SYSTEM_PROMPT),
+            ("human", "{input}"),
+        ]
     )
-]
-
-# Tool isimlerini string olarak al
-tool_names_str = ", ".join([tool.name for tool in tools])
-
-# Agent template
-agent_template = f"""You are NextLevelBot, an intelligent assistant that helps users explore and learn about video games.
-
-Be as helpful as possible and return as much relevant information as you can.
-Never use any knowledge that is not returned by a tool.
-If the tools do not return any information or an empty result, you MUST state that you could not find the information in the database.
-Do not try to answer the question from your own knowledge.
-Do not guess or make assumptions.
-Do not answer any questions using your pre-trained knowledge — only use the information provided via tools.
-Only answer questions that relate to video games, genres, developers, players, or play patterns.
-Ignore any question that is not about video games or gaming data.
-
-TOOLS:
-------
-
-You have access to the following tools:
-
-{tool_names_str}
-
-Only use the "General Chat" tool for basic acknowledgments or clarifying questions.
-Never use it to answer data-related questions like recommendations, gameplay details, tags, or relationships.
-For all data-related questions, prefer "Game Search" or "Graph Info".
-
-To use a tool, please use the following format:
-Thought: Do I need to use a tool? Yes
-Action: the action to take, should be one of [{tool_names_str}]
-Action Input: the input to the action
-Observation: the result of the action
-When you have a response to say to the Human, or if you do not need to use a tool, you MUST use the format:
-Thought: Do I need to use a tool? No
-Final Answer: [your response here]
-
-Always use a tool when answering questions. Never generate a final answer without using a tool.
-If no tool seems appropriate, use the "General Chat" tool.
-You must always use the information returned from the tools when forming your response.
-If a query returns a list, summarize or format the list clearly for the user.
-Always use the output of the tool in your response.
-Never say "I don't know" unless the result is actually empty.
-If the result is a list, format it as a bullet point or sentence.
-Always use the output of the tool in your response.
-Never say "I don't know" unless the result is actually empty.
-
-Begin!
-
-Previous conversation history:
-{{chat_history}}
-
-New input: {{input}}
-{{agent_scratchpad}}"""
-
-
-# Agent oluşturuluyor
-agent_executor = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    agent_kwargs={"prefix": agent_template},
-    verbose=True,
-    handle_parsing_errors=True,
-    max_iterations=10,
-    max_execution_time=60
-)
+    game_chat = chat_prompt | llm | StrOutputParser()
 
-# Neo4j hafıza yönetimi
+    # Araçlar
+    tools = [
+        Tool.from_function(
+            name="General Chat",
+            description="For general game-related conversation or follow-ups",
+            func=game_chat.invoke,
+        ),
+        Tool.from_function(
+            name="Game Search",
+            description="Use this tool to find video games based on their descriptions, tags, developers, or platforms.",
+            func=get_game_info,
+        ),
+        Tool.from_function(
+            name="Graph Info",
+            description="Use this for database queries about users, games, or friendships.",
+            func=enhanced_cypher_qa,
+        )
+    ]
+
+    # Agent oluşturuluyor; prompt token bütçesiyle kurulur
+    react_agent = BudgetedReActAgent.from_llm_and_tools(
+        llm,
+        tools,
+        prefix=AGENT_PREFIX,
+        format_instructions=AGENT_FORMAT_INSTRUCTIONS,
+        suffix=AGENT_SUFFIX,
+        input_variables=["input", "chat_history", "agent_scratchpad"],
+        max_prompt_tokens=int(st.secrets.get("AGENT_PROMPT_TOKEN_BUDGET", 6000)),
+        max_request_tokens=int(st.secrets.get("AGENT_REQUEST_TOKEN_BUDGET", 30000)),
+    )
+    agent_executor = AgentExecutor.from_agent_and_tools(
+        agent=react_agent,
+        tools=tools,
+        # Adım adım çıktı stdout yerine izleme panelinde; gerekirse açılabilir
+        verbose=bool(st.secrets.get("AGENT_VERBOSE", False)),
+        handle_parsing_errors=True,
+        max_iterations=10,
+        max_execution_time=60
+    )
+
+    # Mesajlar arka planda batch'ler halinde Neo4j'ye yazılır (yazma yönlendirmesiyle)
+    history_writer = HistoryWriter(
+        get_driver(),
+        get_database(),
+        max_queue=int(st.secrets.get("HISTORY_QUEUE_SIZE", 1000)),
+        batch_size=int(st.secrets.get("HISTORY_BATCH_SIZE", 100)),
+        flush_interval=float(st.secrets.get("HISTORY_FLUSH_INTERVAL", 0.5)),
+    )
+
+    # Agent'ı hafızalı hale getiriyoruz
+    chat_agent = RunnableWithMessageHistory(
+        agent_executor,
+        get_memory,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+        max_execution_time=None
+    )
+
+    # Net sorular için agent'ı atlayan yönlendirici
+    router = IntentRouter(
+        embeddings.embed_documents,
+        threshold=float(st.secrets.get("ROUTER_THRESHOLD", 0.08)),
+        # Varsayılan, text-embedding-ada-002 benzerlik aralığına göre seçildi
+        min_similarity=float(st.secrets.get("ROUTER_MIN_SIMILARITY", 0.78)),
+    )
+    # Agent dışındaki araç çağrıları da izde görünsün
+    fast_path_tools = {
+        "Game Search": traced("tool", "Game Search", get_game_info),
+        "Graph Info": traced("tool", "Graph Info", enhanced_cypher_qa),
+    }
+
+    # Çok parçalı sorular için paralel araç çalıştırma
+    planner = ParallelPlanner(
+        llm,
+        fast_path_tools,
+        max_execution_time=agent_executor.max_execution_time,
+    )
+
+    return SimpleNamespace(
+        llm=llm,
+        graph=graph,
+        agent_executor=agent_executor,
+        history_writer=history_writer,
+        chat_agent=chat_agent,
+        router=router,
+        fast_path_tools=fast_path_tools,
+        planner=planner,
+    )
+
+
+# Yönlendirici merkezleri de ısınma sırasında hesaplansın
+router_centroids = LazyResource("router centroids", lambda: get_agent().router._get_centroids())
+
+
+def component_metrics():
+    """Yüklenmiş bileşenlerin sayaçları; metrik paneli hiçbir şeyi yüklemesin diye hazır olmayanlar atlanır"""
+    from llm import get_embeddings
+
+    metrics = {}
+    if get_agent.ready:
+        agent = get_agent()
+        metrics["history_writer"] = agent.history_writer.metrics()
+        metrics["router"] = agent.router.stats()
+    if vector_tool.ready:
+        metrics["answer_cache"] = vector_tool().answer_cache.stats()
+    if cypher_tool.ready:
+        metrics["template_cache"] = cypher_tool().template_cache.stats()
+        metrics["result_cache"] = cypher_tool().result_cache.stats()
+    if get_embeddings.ready and hasattr(get_embeddings(), "stats"):
+        metrics["embeddings"] = get_embeddings().stats()
+    return metrics
+
+
+def warm_up_agent():
+    """Sunucu başlarken ağır bileşenleri arka planda hazırla; ilk soru beklemesin"""
+    return warm_up(get_agent, vector_tool, cypher_tool, router_centroids)
+
+
+# Neo4j hafıza yönetimi: son N tur aynen, daha eskileri özet olarak
 def get_memory(session_id):
-    return Neo4jChatMessageHistory(session_id=session_id, graph=graph)
-
-# Agent'ı hafızalı hale getiriyoruz
-chat_agent = RunnableWithMessageHistory(
-    agent_executor,
-    get_memory,
-    input_messages_key="input",
-    history_messages_key="chat_history",
-    max_execution_time=None
-)
+    from memory import SummarizedNeo4jChatMessageHistory, WriteBehindChatMessageHistory
+
+    agent = get_agent()
+    options = {
+        "session_id": session_id,
+        "graph": agent.graph,
+        "llm": agent.llm,
+        "window": int(st.secrets.get("MEMORY_WINDOW", 3)),
+        "token_budget": int(st.secrets.get("MEMORY_TOKEN_BUDGET", 1500)),
+    }
+    if st.secrets.get("HISTORY_WRITE_BEHIND", True):
+        return WriteBehindChatMessageHistory(writer=agent.history_writer, **options)
+    return SummarizedNeo4jChatMessageHistory(**options)
+
+
+def flush_history():
+    """Bekleyen sohbet mesajlarını Neo4j'ye yaz (oturum sonu)"""
+    # Agent hiç kurulmadıysa yazılacak bir şey de yok
+    if get_agent.ready:
+        get_agent().history_writer.flush()
+
+
+def has_history(session_id):
+    try:
+        return bool(get_memory(session_id).messages)
+    except Exception:
+        return False
+
+
+def run_fast_path(user_input, session_id):
+    """Soru net sınıflandırılabiliyorsa aracı doğrudan çağırır, değilse (None, güven) döndürür"""
+    from router import is_follow_up
+
+    # Araçlar sohbet geçmişini görmez; önceki cevaba atıf yapan soruları agent cevaplasın
+    if is_follow_up(user_input) and has_history(session_id):
+        return None, 0.0
+
+    agent = get_agent()
+    # Çok parçalı soruyu tek araca gönderirsek diğer kısımlar cevapsız kalır; planlayıcıya bırak
+    if agent.planner.is_multi_part(user_input):
+        return None, 0.0
+    try:
+        route, confidence, _ = agent.router.classify(user_input)
+    except Exception:
+        return None, 0.0
+    if route is None:
+        return None, confidence
+
+    started = time.perf_counter()
+    try:
+        answer = agent.fast_path_tools[route](user_input)
+    except Exception as e:
+        logger.warning("fast path %s failed, falling back to the agent: %s", route, e)
+        return None, confidence
+    agent.router.record_fast_path(route, confidence, time.perf_counter() - started)
+
+    save_turn(session_id, user_input, answer)
+    return (route, answer), confidence
+
+
+def run_planner(user_input):
+    """Soru bağımsız parçalara bölünebiliyorsa sentez cevabının token akışını döndürür"""
+    planner = get_agent().planner
+    if not planner.is_multi_part(user_input):
+        return None
+    try:
+        tokens = planner.stream(user_input)
+        if tokens is None:
+            return None
+        # Sentez akışı tembel; ilk parçayı burada alalım ki LLM hatası agent'a düşsün
+        first = next(tokens)
+    except StopIteration:
+        return None
+    except Exception as e:
+        logger.warning("planner failed, falling back to the agent: %s", e)
+        return None
+    return itertools.chain([first], tokens)
+
+
+def save_turn(session_id, user_input, answer):
+    # Agent'ı atlasak da konuşma geçmişi kaydedilmeli
+    history = get_memory(session_id)
+    history.add_user_message(user_input)
+    history.add_ai_message(answer)
+
 
 # Streamlit UI için handler
-def generate_response(user_input):
+def generate_response(user_input, session_id=None):
     try:
-        result = chat_agent.invoke(
-            {"input": user_input},
-            config={"configurable": {"session_id": get_session_id()}}
-        )
-        return result["output"]  # Sadece "output" anahtarını döndür
+        session_id = session_id or get_session_id()
+        with trace(user_input, session_id) as current:
+            current.path = "fast path"
+            fast_path, confidence = run_fast_path(user_input, session_id)
+            if fast_path:
+                return fast_path[1]
+
+            current.path = "planner"
+            tokens = run_planner(user_input)
+            if tokens is not None:
+                answer = "".join(tokens)
+                save_turn(session_id, user_input, answer)
+                return answer
+
+            current.path = "agent"
+            agent = get_agent()
+            started = time.perf_counter()
+            result = agent.chat_agent.invoke(
+                {"input": user_input},
+                config={"configurable": {"session_id": session_id}}
+            )
+            agent.router.record_agent(confidence, time.perf_counter() - started)
+            return result["output"]  # Sadece "output" anahtarını döndür
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
+
+# Streamlit UI için token akışı
+def stream_response(user_input):
+    """
+    Agent'ı arka planda çalıştırır ve olayları geldikçe üretir:
+    ("tool", araç adı), ("token", metin) ve en sonda ("done", tam cevap)
+    """
+    events = queue.Queue()
+    # Session id Streamlit thread'inde alınmalı
+    session_id = get_session_id()
+
+    def run():
+        try:
+            with trace(user_input, session_id) as current:
+                answer = answer_streaming(current)
+            events.put(("done", answer))
+        except Exception as e:
+            events.put(("done", f"❌ Error: {str(e)}"))
+
+    def answer_streaming(current):
+        current.path = "fast path"
+        fast_path, confidence = run_fast_path(user_input, session_id)
+        if fast_path:
+            route, answer = fast_path
+            events.put(("tool", route))
+            return answer
+
+        current.path = "planner"
+        tokens = run_planner(user_input)
+        if tokens is not None:
+            events.put(("tool", "parallel plan"))
+            answer = ""
+            for token in tokens:
+                answer += token
+                events.put(("token", token))
+            save_turn(session_id, user_input, answer)
+            return answer
+
+        current.path = "agent"
+        agent = get_agent()
+        started = time.perf_counter()
+        result = agent.chat_agent.invoke(
+            {"input": user_input},
+            config={
+                "configurable": {"session_id": session_id},
+                "callbacks": [AgentStreamHandler(events)],
+            },
+        )
+        agent.router.record_agent(confidence, time.perf_counter() - started)
+        return result["output"]
+
+    threading.Thread(target=run, daemon=True).start()
+
+    while True:
+        kind, value = events.get()
+        yield kind, value
+        if kind == "done":
+            break
@@ -0,0 +1,147 @@
+import logging
+from typing import Optional
+
+from langchain.agents import ZeroShotAgent
+from langchain_core.agents import AgentFinish
+from langchain_core.messages import get_buffer_string
+from pydantic import PrivateAttr
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Prompt sırası: önce her çağrıda aynı kalan talimatlar, araçlar ve format
+# (sağlayıcının prompt cache'i bu ortak öneki yeniden kullanır), en sonda
+# geçmiş, soru ve scratchpad.
+AGENT_PREFIX = """You are NextLevelBot, an intelligent assistant that helps users explore and learn about video games.
+
+Be as helpful as possible and return as much relevant information as you can.
+Never use any knowledge that is not returned by a tool.
+If the tools do not return any information or an empty result, you MUST state that you could not find the information in the database.
+Do not try to answer the question from your own knowledge.
+Do not guess or make assumptions.
+Do not answer any questions using your pre-trained knowledge — only use the information provided via tools.
+Only answer questions that relate to video games, genres, developers, players, or play patterns.
+Ignore any question that is not about video games or gaming data.
+
+TOOLS:
+------
+
+You have access to the following tools:"""
+
+AGENT_FORMAT_INSTRUCTIONS = """Only use the "General Chat" tool for basic acknowledgments or clarifying questions.
+Never use it to answer data-related questions like recommendations, gameplay details, tags, or relationships.
+For all data-related questions, prefer "Game Search" or "Graph Info".
+
+To use a tool, please use the following format:
+Thought: Do I need to use a tool? Yes
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+When you have a response to say to the Human, or if you do not need to use a tool, you MUST use the format:
+Thought: Do I need to use a tool? No
+Final Answer: [your response here]
+
+Always use a tool when answering questions. Never generate a final answer without using a tool.
+If no tool seems appropriate, use the "General Chat" tool.
+Always use the output of the tool in your response.
+Never say "I don't know" unless the result is actually empty.
+If the result is a list, summarize or format it clearly as bullet points or a sentence."""
+
+AGENT_SUFFIX = """Begin!
+
+Previous conversation history:
+{chat_history}
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+TRUNCATED = " …(truncated)"
+OMITTED = "(omitted, see the answer above)"
+
+
+def _clip_tokens(text, tokens):
+    # Kaba tahmin: İngilizce metinde token başına ~4 karakter
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit] + TRUNCATED
+
+
+class BudgetedReActAgent(ZeroShotAgent):
+    """
+    Prompt'u bölüm bölüm token sayarak kuran ReAct agent'ı. Son gözlemler
+    aynen, eskileri kısaltılmış olarak scratchpad'e girer; prompt yine de
+    max_prompt_tokens'ı aşıyorsa en eski gözlemler çıkarılır. Bir sonraki
+    çağrıyla isteğin toplam prompt token'ı max_request_tokens'ı geçecekse
+    döngü son gözlemle bitirilir.
+    """
+
+    max_prompt_tokens: int = 6000
+    max_request_tokens: int = 30000
+    keep_recent: int = 1
+    old_observation_tokens: int = 150
+
+    _static_tokens: Optional[int] = PrivateAttr(default=None)
+
+    def _count(self, text):
+        return self.llm_chain.llm.get_num_tokens(text) if text else 0
+
+    def static_tokens(self):
+        """Değişkenler boşken prompt'un token sayısı (her çağrıda aynı)"""
+        if self._static_tokens is None:
+            empty = {name: "" for name in self.llm_chain.prompt.input_variables}
+            self._static_tokens = self._count(self.llm_chain.prompt.format(**empty))
+        return self._static_tokens
+
+    def _step(self, action, observation):
+        return f"{action.log}\n{self.observation_prefix}{observation}\n{self.llm_prefix}"
+
+    def _steps(self, intermediate_steps):
+        """Adım metinleri; son keep_recent gözlem dışındakiler kısaltılır"""
+        old = len(intermediate_steps) - self.keep_recent
+        return [
+            self._step(action, _clip_tokens(str(observation), self.old_observation_tokens) if i < old else observation)
+            for i, (action, observation) in enumerate(intermediate_steps)
+        ]
+
+    def _construct_scratchpad(self, intermediate_steps):
+        return "".join(self._steps(intermediate_steps))
+
+    def plan(self, intermediate_steps, callbacks=None, **kwargs):
+        if isinstance(kwargs.get("chat_history"), list):
+            kwargs["chat_history"] = get_buffer_string(kwargs["chat_history"])
+
+        with span("prompt", f"step {len(intermediate_steps) + 1}") as attrs:
+            sections = {
+                "static_tokens": self.static_tokens(),
+                "history_tokens": self._count(kwargs.get("chat_history")),
+                "input_tokens": self._count(kwargs.get("input")),
+            }
+            fixed = sum(sections.values())
+
+            steps = self._steps(intermediate_steps)
+            sizes = [self._count(step) for step in steps]
+
+            # Hâlâ sığmıyorsa en eski gözlemleri tamamen çıkar
+            omitted = 0
+            while omitted < len(steps) - self.keep_recent and fixed + sum(sizes) > self.max_prompt_tokens:
+                action, _ = intermediate_steps[omitted]
+                steps[omitted] = self._step(action, OMITTED)
+                sizes[omitted] = self._count(steps[omitted])
+                omitted += 1
+
+            # Önceki çağrılarda gönderilen yaklaşık prompt token'ı: i. çağrı sabit kısım + ilk i adım
+            spent = sum(fixed + sum(sizes[:i]) for i in range(len(steps)))
+            prompt_tokens = fixed + sum(sizes)
+            attrs.update(sections, scratchpad_tokens=sum(sizes), prompt_tokens=prompt_tokens,
+                         spent_tokens=spent, omitted_steps=omitted)
+
+            if intermediate_steps and spent + prompt_tokens > self.max_request_tokens:
+                attrs["budget_stop"] = True
+                logger.info("agent stopped before exceeding the token budget (%d spent, next call %d)",
+                            spent, prompt_tokens)
+                return AgentFinish({"output": str(intermediate_steps[-1][1])}, log="token budget reached")
+
+        full_output = self.llm_chain.predict(
+            callbacks=callbacks, agent_scratchpad="".join(steps), stop=self._stop, **kwargs
+        )
+        return self.output_parser.parse(full_output)
@@ -0,0 +1,252 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Description embedding'lerini oyun app_id'si ile birlikte okur
+FULL_QUERY = """
+MATCH (g:Game)-[:HAS_DESCRIPTION]->(d:Description)
+WHERE d.embedding IS NOT NULL
+RETURN g.app_id AS app_id, d.embedding AS embedding, coalesce(d.embedded_at, 0) AS embedded_at
+"""
+
+CHANGED_QUERY = """
+MATCH (d:Description) WHERE d.embedded_at > $since
+MATCH (g:Game)-[:HAS_DESCRIPTION]->(d)
+WHERE d.embedding IS NOT NULL
+RETURN g.app_id AS app_id, d.embedding AS embedding, d.embedded_at AS embedded_at
+"""
+
+COUNT_QUERY = "MATCH (d:Description) WHERE d.embedding IS NOT NULL RETURN count(d) AS count"
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _kmeans(vectors, n_lists, iterations=10, sample_size=20000, seed=42):
+    """Küresel k-means (cosine); merkezler örneklem üzerinde eğitilir"""
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for i in range(n_lists):
+            members = sample[assignment == i]
+            if len(members):
+                centroids[i] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+class AnnIndex:
+    """
+    Description embedding'lerinin process içi IVF kopyası. Vektörler liste sırasına
+    göre diske yazılır ve memory-map ile yüklenir; son build'den sonra değişen
+    embedding'ler küçük bir bellek içi delta segmentinde tutulur.
+
+    Her build kendi sürüm dizinine yazılır ve meta.json os.replace ile yeni
+    sürüme çevrilir; açık memory-map'ler eski dosyaları okumaya devam eder.
+    """
+
+    def __init__(self, path, n_probe=8, rebuild_ratio=0.1):
+        self.path = path
+        self.n_probe = n_probe
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.Lock()
+
+        self.vectors = None
+        self.centroids = None
+        self.offsets = None
+        self.app_ids = []
+        self.marker = 0
+        self.version = None
+        self._positions = {}
+        self._deleted = set()
+        self._delta = {}
+
+    @property
+    def size(self):
+        # Delta'daki eski kayıtlar zaten _deleted içinde sayıldı
+        return len(self.app_ids) - len(self._deleted) + len(self._delta)
+
+    def _read_meta(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # Sürüm dizini olmayan eski düzen okunmaz; bir sonraki senkronizasyonda yeniden kurulur
+        return meta if meta.get("version") else None
+
+    def load(self):
+        """Diskteki index'i memory-map ile yükle; yoksa False"""
+        meta = self._read_meta()
+        if meta is None:
+            return False
+        directory = os.path.join(self.path, meta["version"])
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        centroids = np.load(os.path.join(directory, "centroids.npy"))
+        offsets = np.load(os.path.join(directory, "offsets.npy"))
+        with self._lock:
+            self.vectors = vectors
+            self.centroids = centroids
+            self.offsets = offsets
+            self.version = meta["version"]
+            self.app_ids = meta["app_ids"]
+            self.marker = meta["marker"]
+            self._positions = {app_id: i for i, app_id in enumerate(self.app_ids)}
+            self._deleted = set()
+            self._delta = {}
+        return True
+
+    def load_if_newer(self):
+        """Başka bir process daha yeni bir sürüm kurduysa onu yükle"""
+        meta = self._read_meta()
+        if meta is None or meta["version"] == self.version:
+            return False
+        return self.load()
+
+    @contextmanager
+    def build_lock(self):
+        """Process'ler arası build kilidi; aynı anda tek worker index kurar"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "build.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def build(self, rows):
+        """(app_id, embedding, embedded_at) satırlarından index'i baştan kur ve kaydet"""
+        rows = list(rows)
+        if not rows:
+            return
+        app_ids = [row[0] for row in rows]
+        vectors = _normalize(np.asarray([row[1] for row in rows], dtype=np.float32))
+        marker = max(row[2] for row in rows)
+
+        n_lists = max(1, min(int(np.sqrt(len(vectors))), len(vectors)))
+        centroids = _kmeans(vectors, n_lists)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+
+        # Aynı listedeki vektörler diskte art arda dursun
+        order = np.argsort(assignment, kind="stable")
+        vectors = vectors[order]
+        app_ids = [app_ids[i] for i in order]
+        offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1)).astype(np.int64)
+
+        # Yeni sürüm ayrı dizine; açık memory-map'lerin dosyaları yerinde değişmez
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        directory = os.path.join(self.path, version)
+        os.makedirs(directory)
+        np.save(os.path.join(directory, "vectors.npy"), vectors)
+        np.save(os.path.join(directory, "centroids.npy"), centroids)
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+        tmp_path = os.path.join(self.path, f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "app_ids": app_ids, "marker": marker, "built_at": time.time()}, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+        self.load()
+        self._remove_old_versions(version)
+
+    def _remove_old_versions(self, current, keep=2):
+        # Bir önceki sürüm de kalır: meta.json'u yeni okumuş bir process onu yüklüyor olabilir.
+        # Linux'ta silinen dosyanın memory-map'i kapanana kadar geçerli kalır.
+        versions = sorted(
+            name for name in os.listdir(self.path)
+            if name.startswith("v") and os.path.isdir(os.path.join(self.path, name))
+        )
+        for name in versions[:-keep]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def apply_changes(self, rows):
+        """Son senkronizasyondan sonra değişen embedding'leri delta segmentine ekle"""
+        with self._lock:
+            for app_id, embedding, embedded_at in rows:
+                vector = _normalize(np.asarray(embedding, dtype=np.float32))
+                self._delta[app_id] = vector
+                if app_id in self._positions:
+                    self._deleted.add(app_id)
+                self.marker = max(self.marker, embedded_at)
+
+    def needs_rebuild(self):
+        return self.vectors is None or len(self._delta) > self.rebuild_ratio * max(len(self.app_ids), 1)
+
+    def search(self, embedding, k=4):
+        """En yakın k oyunun [(app_id, score)] listesi"""
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            candidates = []
+            if self.vectors is not None and len(self.app_ids):
+                probe = min(self.n_probe, len(self.centroids))
+                lists = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+                for i in lists:
+                    start, end = self.offsets[i], self.offsets[i + 1]
+                    if start == end:
+                        continue
+                    scores = np.asarray(self.vectors[start:end]) @ query
+                    top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+                    candidates.extend(
+                        (self.app_ids[start + j], float(scores[j])) for j in top
+                        if self.app_ids[start + j] not in self._deleted
+                    )
+            candidates.extend((app_id, float(vector @ query)) for app_id, vector in self._delta.items())
+
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:k]
+
+
+class AnnIndexSync:
+    """AnnIndex'i Neo4j'deki embedded_at işaretine göre arka planda güncel tutar"""
+
+    def __init__(self, index, driver, database=None, interval=60):
+        self.index = index
+        self._driver = driver
+        self._database = database
+        self.interval = interval
+
+    def sync(self):
+        with self._driver.session(database=self._database, default_access_mode="READ") as session:
+            total = session.run(COUNT_QUERY).single()["count"]
+            # Silinen ya da çok sayıda değişen kayıt varsa baştan kur
+            if self.index.needs_rebuild() or total < self.index.size:
+                with self.index.build_lock():
+                    # Kilidi beklerken başka bir worker kurduysa onu kullan
+                    if self.index.load_if_newer() and not self.index.needs_rebuild() and total >= self.index.size:
+                        logger.info("ann index: loaded version %s built by another worker", self.index.version)
+                    else:
+                        started = time.perf_counter()
+                        rows = [(r["app_id"], r["embedding"], r["embedded_at"]) for r in session.run(FULL_QUERY)]
+                        self.index.build(rows)
+                        logger.info("ann index: rebuilt %d vectors in %.1fs",
+                                    len(rows), time.perf_counter() - started)
+
+            rows = [(r["app_id"], r["embedding"], r["embedded_at"])
+                    for r in session.run(CHANGED_QUERY, since=self.index.marker)]
+            if rows:
+                self.index.apply_changes(rows)
+                logger.info("ann index: applied %d changed vectors", len(rows))
+
+    def start(self):
+        def run():
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.warning("ann index sync failed: %s", e)
+                time.sleep(self.interval)
+
+        threading.Thread(target=run, name="ann-index-sync", daemon=True).start()
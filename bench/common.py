@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+
+def add_common_args(parser):
+    parser.add_argument("--neo4j-uri", default=os.environ.get("NEO4J_URI", "bolt://localhost:7687"))
+    parser.add_argument("--neo4j-username", default=os.environ.get("NEO4J_USERNAME", "neo4j"))
+    parser.add_argument("--neo4j-password", default=os.environ.get("NEO4J_PASSWORD", "password"))
+    parser.add_argument("--neo4j-database", default=os.environ.get("NEO4J_DATABASE", "neo4j"))
+    parser.add_argument("--workdir", help="Cache ve snapshot dizini (varsayılan: geçici dizin)")
+    parser.add_argument("--secret", action="append", default=[], metavar="KEY=VALUE",
+                        help="Ek secrets.toml değeri, örn. ANN_INDEX_ENABLED=true")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def _toml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(str(value))
+
+
+def configure(args):
+    """
+    Uygulama modüllerinin okuduğu st.secrets'ı benchmark ayarlarıyla doldurur.
+    Tüm cache'ler çalışma dizinine yazılır; gerçek .cache/ dizinine dokunulmaz.
+    """
+    workdir = args.workdir or tempfile.mkdtemp(prefix="nextlevelbot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    secrets = {
+        "NEO4J_URI": args.neo4j_uri,
+        "NEO4J_USERNAME": args.neo4j_username,
+        "NEO4J_PASSWORD": args.neo4j_password,
+        "NEO4J_DATABASE": args.neo4j_database,
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_MODEL": "scripted-fake",
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+        "CYPHER_TEMPLATE_PATH": os.path.join(workdir, "cypher_templates.json"),
+        "SCHEMA_SNAPSHOT_PATH": os.path.join(workdir, "schema_snapshot.json"),
+        "ANN_INDEX_DIR": os.path.join(workdir, "ann_index"),
+        # Hashing embedding'lerinde benzerlikler gerçek modeldekinden çok daha düşük
+        "ROUTER_MIN_SIMILARITY": 0.2,
+    }
+    for item in args.secret:
+        key, _, value = item.partition("=")
+        try:
+            secrets[key] = json.loads(value)
+        except ValueError:
+            secrets[key] = value
+
+    path = os.path.join(workdir, "secrets.toml")
+    with open(path, "w", encoding="utf-8") as f:
+        for key, value in secrets.items():
+            f.write(f"{key} = {_toml_value(value)}\n")
+
+    from streamlit.runtime.secrets import secrets_singleton
+    secrets_singleton._file_paths = [path]
+    secrets_singleton._secrets = None
+    return workdir
+
+
+def install_fakes(llm_latency=0.3, token_latency=0.0, embedding_latency=0.05, recorder=None):
+    """Sahte LLM ve embedding modelini llm.py'deki lazy singleton'lara yerleştir"""
+    import llm
+    from bench.fakes import HashingEmbeddings, ScriptedChatModel
+
+    fake_llm = ScriptedChatModel(latency=llm_latency, token_latency=token_latency, recorder=recorder)
+    fake_embeddings = HashingEmbeddings(latency=embedding_latency, recorder=recorder)
+    llm.get_llm.set(fake_llm)
+    llm.get_base_embeddings.set(fake_embeddings)
+    return fake_llm, fake_embeddings
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from router import ROUTE_RULES
+
+QUOTED_PATTERN = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+
+
+class StageRecorder:
+    """Aşama adı -> süre listesi; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(list)
+
+
+def _quoted(text):
+    match = QUOTED_PATTERN.search(text)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def _last_line_after(text, marker):
+    index = text.rfind(marker)
+    return text[index + len(marker):].strip().splitlines()[0].strip() if index >= 0 else ""
+
+
+def _route(question):
+    return next((route for pattern, route in ROUTE_RULES if pattern.search(question)), "Game Search")
+
+
+def _cypher_reply(text):
+    question = _last_line_after(text, "Question:")
+    name = _quoted(question)
+    lowered = question.lower()
+    if name and "friend" in lowered:
+        cypher, params = "MATCH (u:User {username: $username})-[:FRIENDS_WITH]-(f:User) RETURN f.username", {"username": name}
+    elif name and ("played" in lowered or "hours" in lowered):
+        cypher = ("MATCH (u:User {username: $username})-[p:PLAYED]->(g:Game) "
+                  "RETURN g.title, p.total_playtime ORDER BY p.total_playtime DESC LIMIT $limit")
+        params = {"username": name, "limit": 10}
+    elif name and ("platform" in lowered or "support" in lowered):
+        cypher, params = "MATCH (g:Game {title: $title})-[:SUPPORTS]->(p:Platform) RETURN p.name", {"title": name}
+    elif name and "tag" in lowered:
+        cypher, params = "MATCH (g:Game {title: $title})-[:HAS_TAG]->(t:Tag) RETURN t.name", {"title": name}
+    else:
+        cypher, params = "MATCH (g:Game) RETURN g.title, g.app_id LIMIT $limit", {"limit": 10}
+    return json.dumps({"cypher": cypher, "params": params})
+
+
+def _agent_reply(text):
+    # Şablonda format açıklamaları da "Observation:" içeriyor; son "Question:" satırından sonrası scratchpad
+    scratchpad = text[text.rfind("\nQuestion:"):]
+    if "Observation:" in scratchpad:
+        observation = scratchpad[scratchpad.rfind("Observation:") + len("Observation:"):].strip()
+        return f"Thought: Do I need to use a tool? No\nFinal Answer: {observation[:300] or 'Nothing found.'}"
+    question = _last_line_after(text, "\nQuestion:")
+    return f"Thought: Do I need to use a tool? Yes\nAction: {_route(question)}\nAction Input: {question}"
+
+
+def _plan_reply(text):
+    question = _last_line_after(text, "Question:")
+    parts = [p.strip(" ?.,") for p in re.split(r"\band\b|;", question) if p.strip(" ?.,")]
+    steps = [f'{{"tool": "{_route(part)}", "input": "{part.replace(chr(34), chr(39))}?"}}' for part in parts]
+    return "[" + ", ".join(steps) + "]"
+
+
+# (desen, cevap) çiftleri; ilk eşleşen kullanılır
+DEFAULT_RULES = [
+    (r"Task: Generate Cypher", _cypher_reply),
+    (r"split a user's question", _plan_reply),
+    (r"using ONLY the tool results below", lambda text: "Here is what I found: " + text[-300:].strip()),
+    (r"To use a tool, please use the following format", _agent_reply),
+    (r"interprets Neo4j database query results", lambda text: "The database returned: " + _last_line_after(text, "Context from database:")[:300]),
+    (r"Progressively summarize", lambda text: "The user asked about games and players."),
+    (r"answering questions about video games based on the provided context", lambda text: "These games match the description."),
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Prompt'a göre senaryolu cevap veren, gecikmesi ayarlanabilen sahte ChatOpenAI"""
+
+    latency: float = 0.3
+    token_latency: float = 0.0
+    streaming: bool = True
+    model_name: str = "scripted-fake"
+    rules: list = Field(default_factory=lambda: list(DEFAULT_RULES))
+    recorder: Optional[Any] = None
+
+    @property
+    def _llm_type(self):
+        return "scripted-fake"
+
+    def _reply(self, messages):
+        text = "\n".join(str(m.content) for m in messages)
+        for pattern, reply in self.rules:
+            if re.search(pattern, text):
+                return reply(text) if callable(reply) else reply
+        return "OK"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        content = self._reply(messages)
+        if self.recorder:
+            self.recorder.record("llm", time.perf_counter() - started)
+        message = AIMessage(content=content, usage_metadata=self._usage(messages, content))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        content = self._reply(messages)
+        for token in re.findall(r"\S+\s*|\s+", content):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        # ChatOpenAI(stream_usage=True) gibi kullanım bilgisi son parçada gelir
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, content)))
+        if self.recorder:
+            self.recorder.record("llm", time.perf_counter() - started)
+
+    def _usage(self, messages, content):
+        input_tokens = self.get_num_tokens_from_messages(messages)
+        output_tokens = self.get_num_tokens(content)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def get_num_tokens(self, text):
+        # Yaklaşık: 4 karakter ~ 1 token
+        return max(1, len(text) // 4)
+
+    def get_num_tokens_from_messages(self, messages, tools=None):
+        return sum(self.get_num_tokens(str(m.content)) for m in messages)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Kelime ve kelime çiftlerini hash'leyerek deterministik vektör üreten sahte
+    OpenAIEmbeddings; benzer metinler benzer vektörler alır.
+    """
+
+    model = "hashing-embeddings"
+
+    def __init__(self, dim=1536, latency=0.05, recorder=None):
+        self.dim = dim
+        self.latency = latency
+        self.recorder = recorder
+
+    def _vector(self, text):
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = int(hashlib.md5(feature.encode("utf-8")).hexdigest()[:8], 16)
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts, chunk_size=None):
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        vectors = [self._vector(text) for text in texts]
+        if self.recorder:
+            self.recorder.record("embedding", time.perf_counter() - started)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
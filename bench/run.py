@@ -0,0 +1,203 @@
+import sys
+import os
+
+# run.py dosyasının bulunduğu dizin -> proje kök dizini
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench.common import add_common_args, configure, install_fakes
+from bench.fakes import StageRecorder
+
+# README'deki örnek sorular
+README_QUERIES = [
+    "Who are the friends of 'gamer123'?",
+    "Recommend me an RPG game released after 2020",
+    "What games has 'pixelmaster' played the most?",
+    "What platforms does 'Hades' support?",
+]
+
+WORKLOAD_TEMPLATES = [
+    "Who are the friends of '{user}'?",
+    "What games has '{user}' played the most?",
+    "What platforms does '{game}' support?",
+    "Which tags does '{game}' have?",
+    "Recommend me a {tag} game",
+    "Find games similar to {game}",
+    "Suggest a game about {tag} and who are the friends of '{user}'?",
+    "Tell me something about {game}",
+]
+
+
+def generated_workload(dataset, size, seed):
+    """Sentetik grafla tutarlı isimlerle soru listesi"""
+    from bench.synthetic_graph import TAGS
+
+    rng = random.Random(seed)
+    return [
+        rng.choice(WORKLOAD_TEMPLATES).format(
+            user=rng.choice(dataset["users"])["username"],
+            game=rng.choice(dataset["games"])["title"],
+            tag=rng.choice(TAGS),
+        )
+        for _ in range(size)
+    ]
+
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples) * 1000.0
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def instrument(recorder):
+    """Aşama sürelerini ölçmek için modül fonksiyonlarını sarmala"""
+    import agent
+    import tools.vector as vector
+    import tools.cypher as cypher
+
+    stack = agent.get_agent()
+    stack.router.classify = recorder.wrap("route", stack.router.classify)
+    stack.planner.plan = recorder.wrap("plan", stack.planner.plan)
+    vector.get_game_info = recorder.wrap("game_search", vector.get_game_info)
+    vector.vector_search = recorder.wrap("vector_search", vector.vector_search)
+    cypher.answer_graph_question = recorder.wrap("graph_info", cypher.answer_graph_question)
+    cypher.graph.query = recorder.wrap("neo4j_query", cypher.graph.query)
+
+
+def run_workload(name, questions, concurrency, recorder):
+    import agent
+
+    recorder.reset()
+    latencies, errors = [], 0
+
+    def ask(i, question):
+        started = time.perf_counter()
+        answer = agent.generate_response(question, session_id=f"bench-{name}-{i % 50}")
+        return time.perf_counter() - started, answer.startswith("❌")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for seconds, failed in executor.map(lambda item: ask(*item), enumerate(questions)):
+            latencies.append(seconds)
+            errors += failed
+    wall = time.perf_counter() - started
+    agent.flush_history()
+
+    return {
+        "requests": len(questions),
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "throughput_rps": len(questions) / wall if wall else 0.0,
+        "end_to_end": summarize(latencies),
+        "stages": {stage: summarize(samples) for stage, samples in sorted(recorder.samples.items())},
+    }
+
+
+def compare(current, baseline_path):
+    """İki sonuç dosyasının p50/p95 ve throughput farklarını yazdır"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    for name, result in current["workloads"].items():
+        before = baseline.get("workloads", {}).get(name)
+        if not before:
+            continue
+        print(f"\n{name}:")
+        rows = [("end_to_end", result["end_to_end"], before["end_to_end"])]
+        rows += [(stage, stats, before["stages"].get(stage, {})) for stage, stats in result["stages"].items()]
+        for stage, now, then in rows:
+            for key in ("p50_ms", "p95_ms"):
+                if key in now and key in then and then[key]:
+                    change = 100.0 * (now[key] - then[key]) / then[key]
+                    print(f"  {stage:<15} {key}: {then[key]:9.1f} -> {now[key]:9.1f} ({change:+.1f}%)")
+        print(f"  throughput: {before['throughput_rps']:.2f} -> {result['throughput_rps']:.2f} req/s")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, text=True).strip()
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sahte LLM/embedding ile uçtan uca benchmark")
+    add_common_args(parser)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="LLM çağrısı başına gecikme (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Akış token'ı başına gecikme (s)")
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--workload", choices=["readme", "generated", "all"], default="all")
+    parser.add_argument("--requests", type=int, default=200, help="Üretilen iş yükündeki soru sayısı")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5, help="README sorularının tekrar sayısı")
+    parser.add_argument("--games", type=int, default=500, help="synthetic_graph.py ile aynı değer olmalı")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic_graph.py ile aynı değer olmalı")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args()
+
+    workdir = configure(args)
+    recorder = StageRecorder()
+    install_fakes(args.llm_latency, args.token_latency, args.embedding_latency, recorder)
+
+    from startup import startup_profile
+    import agent
+
+    # Soğuk başlangıç ayrıca ölçülür; iş yükü ısınmış süreçte koşar
+    for resource in (agent.get_agent, agent.vector_tool, agent.cypher_tool, agent.router_centroids):
+        resource.get()
+    instrument(recorder)
+
+    workloads = {}
+    if args.workload in ("readme", "all"):
+        workloads["readme"] = README_QUERIES * args.repeat
+    if args.workload in ("generated", "all"):
+        from bench.synthetic_graph import generate
+        dataset = generate(args.seed, args.games, args.users)
+        workloads["generated"] = generated_workload(dataset, args.requests, args.seed)
+
+    results = {
+        "created_at": time.time(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "neo4j_password"},
+        "workdir": workdir,
+        "startup": startup_profile(),
+        "workloads": {},
+    }
+    for name, questions in workloads.items():
+        print(f"running {name}: {len(questions)} requests, concurrency {args.concurrency}")
+        results["workloads"][name] = run_workload(name, questions, args.concurrency, recorder)
+        summary = results["workloads"][name]
+        print(f"  p50 {summary['end_to_end']['p50_ms']:.0f} ms, p95 {summary['end_to_end']['p95_ms']:.0f} ms, "
+              f"{summary['throughput_rps']:.2f} req/s, {summary['errors']} errors")
+
+    from db import plan_cache
+    results["plan_cache"] = plan_cache.metrics()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,201 @@
+import sys
+import os
+
+# synthetic_graph.py dosyasının bulunduğu dizin -> proje kök dizini
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from bench.common import add_common_args, configure
+
+# README'deki örnek sorularda geçen isimler her zaman grafta bulunur
+SAMPLE_GAMES = ["Hades", "Stardew Valley", "Elden Ring", "Cyberpunk 2077", "Terraria", "Dark Souls"]
+SAMPLE_USERS = ["gamer123", "pixelmaster", "pixelninja", "cooldragon_4617"]
+
+TAGS = ["RPG", "Multiplayer", "Roguelike", "Farming", "Horror", "Open World", "Indie", "Strategy",
+        "Simulation", "Puzzle", "Platformer", "Shooter", "Story Rich", "Survival", "Sandbox", "Space"]
+PLATFORMS = ["Windows", "Mac", "Linux", "Steam Deck"]
+ADJECTIVES = ["Dark", "Lost", "Pixel", "Iron", "Silent", "Cosmic", "Wild", "Hidden", "Broken", "Eternal"]
+NOUNS = ["Kingdom", "Frontier", "Legends", "Voyage", "Dungeon", "Harvest", "Echoes", "Empire", "Odyssey", "Realm"]
+USER_WORDS = ["dragon", "ninja", "wizard", "gamer", "pixel", "shadow", "cool", "storm", "frost", "blaze"]
+DESCRIPTION_WORDS = {
+    "RPG": "level up your hero and choose your path in a deep role playing adventure",
+    "Multiplayer": "team up with friends online in cooperative and competitive matches",
+    "Roguelike": "fight through procedurally generated runs where every death makes you stronger",
+    "Farming": "grow crops raise animals and build a relaxing life on your farm",
+    "Horror": "survive a terrifying atmosphere full of monsters and dark secrets",
+    "Open World": "explore a vast open world with countless places to discover",
+    "Indie": "a handcrafted indie experience with charming art",
+    "Strategy": "plan your moves and outsmart your opponents with careful strategy",
+    "Simulation": "simulate detailed systems and manage every aspect",
+    "Puzzle": "solve clever puzzles that challenge your mind",
+    "Platformer": "run and jump through precise platforming levels",
+    "Shooter": "fast paced shooting action with many weapons",
+    "Story Rich": "a story driven journey with memorable characters",
+    "Survival": "gather resources craft tools and survive harsh conditions",
+    "Sandbox": "build anything you can imagine in a creative sandbox",
+    "Space": "travel between stars and explore space stations and planets",
+}
+
+
+def generate(seed=42, games=500, users=1000, plays_per_user=15, friends_per_user=5, reviews_per_game=20):
+    """Aynı seed ile her seferinde aynı veri setini üretir"""
+    rng = random.Random(seed)
+    today = date(2025, 1, 1)
+
+    titles = SAMPLE_GAMES + [
+        f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}" for i in range(len(SAMPLE_GAMES), games)
+    ]
+    game_rows = []
+    for i, title in enumerate(titles[:games]):
+        tags = rng.sample(TAGS, rng.randint(2, 5))
+        game_rows.append({
+            "app_id": 1000 + i,
+            "title": title,
+            "release_date": str(today - timedelta(days=rng.randint(0, 4000))),
+            "price": round(rng.choice([0, 4.99, 9.99, 19.99, 29.99, 59.99]), 2),
+            "tags": tags,
+            "platforms": ["Windows"] + rng.sample(PLATFORMS[1:], rng.randint(0, 3)),
+            "description": f"{title}. " + " ".join(DESCRIPTION_WORDS[tag] for tag in tags) + ".",
+        })
+
+    usernames = SAMPLE_USERS + [
+        f"{rng.choice(USER_WORDS)}{rng.choice(USER_WORDS)}_{i}" for i in range(len(SAMPLE_USERS), users)
+    ]
+    user_rows = [{"user_id": i, "username": name} for i, name in enumerate(usernames[:users])]
+
+    played = []
+    for user in user_rows:
+        for game in rng.sample(game_rows, min(plays_per_user, len(game_rows))):
+            played.append({
+                "user_id": user["user_id"],
+                "app_id": game["app_id"],
+                "total_playtime": round(rng.expovariate(1 / 40), 1),
+                "days_per_week": rng.randint(1, 7),
+                "last_played_date": str(today - timedelta(days=rng.randint(0, 365))),
+            })
+
+    friends = set()
+    for user in user_rows:
+        for other in rng.sample(user_rows, min(friends_per_user, len(user_rows))):
+            if other["user_id"] != user["user_id"]:
+                friends.add(tuple(sorted((user["user_id"], other["user_id"]))))
+
+    reviews = []
+    for game in game_rows:
+        for reviewer in rng.sample(user_rows, min(reviews_per_game, len(user_rows))):
+            reviews.append({
+                "review_id": len(reviews),
+                "user_id": reviewer["user_id"],
+                "app_id": game["app_id"],
+                "is_recommended": rng.random() < 0.75,
+                "helpful": int(rng.expovariate(1 / 5)),
+                "funny": int(rng.expovariate(1 / 2)),
+                "date": str(today - timedelta(days=rng.randint(0, 1500))),
+            })
+
+    return {
+        "games": game_rows,
+        "users": user_rows,
+        "played": played,
+        "friends": [{"a": a, "b": b} for a, b in sorted(friends)],
+        "reviews": reviews,
+    }
+
+
+LOAD_QUERIES = [
+    ("games", """
+UNWIND $rows AS row
+MERGE (g:Game {app_id: row.app_id})
+SET g.title = row.title, g.release_date = row.release_date, g.price = row.price
+MERGE (g)-[:HAS_DESCRIPTION]->(d:Description)
+SET d.text = row.description, d.embedding = row.embedding, d.embedded_at = timestamp()
+FOREACH (name IN row.tags | MERGE (t:Tag {name: name}) MERGE (g)-[:HAS_TAG]->(t))
+FOREACH (name IN row.platforms | MERGE (p:Platform {name: name}) MERGE (g)-[:SUPPORTS]->(p))
+"""),
+    ("users", "UNWIND $rows AS row MERGE (u:User {user_id: row.user_id}) SET u.username = row.username"),
+    ("played", """
+UNWIND $rows AS row
+MATCH (u:User {user_id: row.user_id}), (g:Game {app_id: row.app_id})
+MERGE (u)-[p:PLAYED]->(g)
+SET p.total_playtime = row.total_playtime, p.days_per_week = row.days_per_week,
+    p.last_played_date = date(row.last_played_date)
+"""),
+    ("friends", """
+UNWIND $rows AS row
+MATCH (a:User {user_id: row.a}), (b:User {user_id: row.b})
+MERGE (a)-[:FRIENDS_WITH]->(b)
+"""),
+    ("reviews", """
+UNWIND $rows AS row
+MATCH (u:User {user_id: row.user_id}), (g:Game {app_id: row.app_id})
+MERGE (r:Review {review_id: row.review_id})
+SET r.is_recommended = row.is_recommended, r.helpful = row.helpful, r.funny = row.funny, r.date = row.date
+MERGE (u)-[:WROTE_REVIEW]->(r)
+MERGE (r)-[:REVIEWS]->(g)
+"""),
+]
+
+VECTOR_INDEX_QUERY = """CREATE VECTOR INDEX gameDescriptions IF NOT EXISTS FOR (d:Description) ON d.embedding
+       OPTIONS {indexConfig: {`vector.dimensions`: $dim, `vector.similarity_function`: 'cosine'}}"""
+
+
+def load(dataset, batch_size=1000, reset=False):
+    """Veri setini paylaşılan sürücü üzerinden yaz ve oyun özetlerini hesapla"""
+    from db import get_driver, get_database
+    from bench.fakes import HashingEmbeddings
+    import data_version
+    import game_summary
+    import schema_bootstrap
+
+    driver, database = get_driver(), get_database()
+    if reset:
+        # CALL ... IN TRANSACTIONS yönetilen transaction içinde çalışmaz; örtük (auto-commit) transaction gerekli.
+        # Sürüm sayaçları silinmez, yoksa sıfırdan başlayıp diğer process'lerin cache'ini geçersizleştiremezler.
+        with driver.session(database=database) as session:
+            session.run(
+                "MATCH (n) WHERE NOT n:DataVersion CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS"
+            ).consume()
+
+    embeddings = HashingEmbeddings(latency=0)
+    schema_bootstrap.bootstrap()
+    driver.execute_query(VECTOR_INDEX_QUERY, {"dim": embeddings.dim}, database_=database)
+
+    vectors = embeddings.embed_documents([game["description"] for game in dataset["games"]])
+    games = [{**game, "embedding": vector} for game, vector in zip(dataset["games"], vectors)]
+
+    for name, query in LOAD_QUERIES:
+        rows = games if name == "games" else dataset[name]
+        started = time.time()
+        for start in range(0, len(rows), batch_size):
+            driver.execute_query(query, {"rows": rows[start:start + batch_size]}, database_=database)
+        print(f"[{name}] {len(rows):,} rows in {time.time() - started:.1f}s")
+
+    data_version.bump("Game", "User", "Review", "Tag", "Platform", "Description", "HAS_DESCRIPTION",
+                      "HAS_TAG", "SUPPORTS", "PLAYED", "FRIENDS_WITH", "WROTE_REVIEW", "REVIEWS")
+
+    game_summary.ensure_schema()
+    game_summary.mark_all_dirty()
+    print(f"{game_summary.refresh_dirty():,} game summaries refreshed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark için seed'li sentetik oyun grafı üret")
+    add_common_args(parser)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--plays-per-user", type=int, default=15)
+    parser.add_argument("--friends-per-user", type=int, default=5)
+    parser.add_argument("--reviews-per-game", type=int, default=20)
+    parser.add_argument("--reset", action="store_true", help="Yüklemeden önce veritabanını boşalt")
+    args = parser.parse_args()
+
+    configure(args)
+    dataset = generate(args.seed, args.games, args.users, args.plays_per_user,
+                       args.friends_per_user, args.reviews_per_game)
+    load(dataset, reset=args.reset)
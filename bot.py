@@ -1,68 +1,67 @@
-import streamlit as st
-from utils import write_message
-from agent import generate_response
 import time
-from neo4j import GraphDatabase
+_imports_started = time.perf_counter()
+import json
+import streamlit as st
+from utils import write_message, save_message, get_session_id
+from agent import stream_response, flush_history, warm_up_agent, component_metrics
 import pandas as pd
 import plotly.graph_objects as go
 from typing import Dict, List, Tuple
+from graph_stats import GraphStatsService, EMPTY_STATS
+from cypher_guard import is_write, run_page
+from startup import record, startup_profile
+from db import get_driver, get_database, pool_metrics, plan_cache
+from tracing import get_tracer
+import data_version
+
+record("bot imports", time.perf_counter() - _imports_started, replace=False)
+
+# Agent, graf ve araçlar ilk soruyu beklemeden arka planda hazırlanır
+warm_up_agent()
 
 
 # --- Neo4j Bağlantı Ayarları ---
-@st.cache_resource
 def init_neo4j_connection():
-    """Neo4j veritabanı bağlantısını başlat"""
+    """Uygulama genelinde paylaşılan Neo4j sürücüsü (tek bağlantı havuzu)"""
     try:
-        # Neo4j bağlantı bilgilerini buraya girin
-        NEO4J_URI = st.secrets.get("NEO4J_URI", "bolt://localhost:7687")
-        NEO4J_USERNAME = st.secrets.get("NEO4J_USERNAME", "neo4j")
-        NEO4J_PASSWORD = st.secrets.get("NEO4J_PASSWORD", "password")
-
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-        return driver
+        return get_driver()
     except Exception as e:
         st.error(f"Neo4j bağlantı hatası: {e}")
         return None
 
 
-@st.cache_data(ttl=300)  # 5 dakika cache
-def get_graph_statistics():
-    """Graf istatistiklerini getir"""
+@st.cache_resource
+def get_stats_service():
+    """Tüm oturumların paylaştığı, arka planda yenilenen istatistik servisi"""
     driver = init_neo4j_connection()
     if not driver:
-        return {"nodes": 0, "relationships": 0, "node_types": [], "rel_types": []}
+        return None
+    return GraphStatsService(driver, database=get_database(), refresh_interval=300)  # 5 dakikada bir
+
+
+def get_graph_statistics():
+    """Graf istatistiklerini getir (count store'dan, son anlık görüntü)"""
+    service = get_stats_service()
+    if not service:
+        return EMPTY_STATS
+
+    stats = service.get()
+    if service.last_error:
+        st.error(f"Veri getirme hatası: {service.last_error}")
+    return stats
+
 
+@st.cache_data(ttl=300)
+def query_writes(query):
+    """Sorgu tipi EXPLAIN ile sunucuya sorulur; her rerun'da tekrar sorulmasın"""
+    driver = init_neo4j_connection()
+    if not driver:
+        return False
     try:
-        with driver.session() as session:
-            # Node sayısı
-            node_count = session.run("MATCH (n) RETURN count(n) as count").single()["count"]
-
-            # İlişki sayısı
-            rel_count = session.run("MATCH ()-[r]->() RETURN count(r) as count").single()["count"]
-
-            # Node türleri
-            node_types = session.run("""
-                MATCH (n) 
-                RETURN labels(n) as labels, count(*) as count 
-                ORDER BY count DESC
-            """).data()
-
-            # İlişki türleri
-            rel_types = session.run("""
-                MATCH ()-[r]->() 
-                RETURN type(r) as type, count(*) as count 
-                ORDER BY count DESC
-            """).data()
-
-            return {
-                "nodes": node_count,
-                "relationships": rel_count,
-                "node_types": node_types,
-                "rel_types": rel_types
-            }
-    except Exception as e:
-        st.error(f"Veri getirme hatası: {e}")
-        return {"nodes": 0, "relationships": 0, "node_types": [], "rel_types": []}
+        return is_write(driver, query, database=get_database())
+    except Exception:
+        # Sözdizimi hatası vs. Execute'ta gösterilir; run_page yazmayı yine reddeder
+        return False
 
 
 @st.cache_data(ttl=300)
@@ -426,7 +425,10 @@ with st.sidebar:
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔄 Refresh", use_container_width=True):
-            st.cache_data.clear()
+            # Sadece istatistikler yenilenir, diğer cache'ler korunur
+            service = get_stats_service()
+            if service:
+                service.refresh()
             st.rerun()
 
     with col2:
@@ -442,24 +444,76 @@ with st.sidebar:
             height=100
         )
 
+        allow_cartesian = st.checkbox("Run even with a cartesian product", key="allow_cartesian")
+        allow_write = False
+        if custom_query and query_writes(custom_query):
+            allow_write = st.checkbox("This query writes to the database. Run it once.", key="allow_write")
+
         col1, col2 = st.columns(2)
         with col1:
+            # Sorgu sadece Execute / Prev / Next ile çalışır; diğer rerun'lar cache'lenmiş sayfayı gösterir
             if st.button("Execute", use_container_width=True):
                 if custom_query:
-                    try:
-                        driver = init_neo4j_connection()
-                        if driver:
-                            with driver.session() as session:
-                                result = session.run(custom_query).data()
-                                st.json(result[:5])  # İlk 5 sonucu göster
-                    except Exception as e:
-                        st.error(f"Query error: {e}")
+                    st.session_state.active_query = custom_query
+                    st.session_state.query_page = 0
+                    st.session_state.query_results = {}
+                    st.session_state.query_pending = True
 
         with col2:
             if st.button("Cancel", use_container_width=True):
                 st.session_state.show_query_input = False
+                st.session_state.active_query = None
+                st.session_state.query_results = {}
                 st.rerun()
 
+        # Sorgu sayfa sayfa, maliyet kontrolüyle çalıştırılıyor
+        if st.session_state.get('active_query'):
+            query = st.session_state.active_query
+            page = st.session_state.get('query_page', 0)
+            results = st.session_state.setdefault('query_results', {})
+            if st.session_state.pop('query_pending', False) and (query, page) not in results:
+                try:
+                    driver = init_neo4j_connection()
+                    if driver:
+                        results[(query, page)] = run_page(
+                            driver,
+                            query,
+                            page=page,
+                            page_size=5,
+                            max_estimated_rows=int(st.secrets.get("CUSTOM_QUERY_MAX_ROWS", 1_000_000)),
+                            timeout=float(st.secrets.get("CUSTOM_QUERY_TIMEOUT", 10)),
+                            allow_cartesian=allow_cartesian,
+                            allow_write=allow_write,
+                            database=get_database(),
+                        )
+                        if results[(query, page)]["write"] and not results[(query, page)]["error"]:
+                            # Neye yazdığı bilinmiyor; tüm Cypher sonuç cache'i geçersizleşsin
+                            data_version.bump("*")
+                except Exception as e:
+                    st.error(f"Query error: {e}")
+
+            response = results.get((query, page))
+            if response:
+                for warning in response["warnings"]:
+                    st.warning(warning)
+                if response["error"]:
+                    st.error(response["error"])
+                else:
+                    st.caption(f"Page {page + 1}")
+                    st.json(response["rows"])
+
+                    prev_col, next_col = st.columns(2)
+                    with prev_col:
+                        if page > 0 and st.button("◀ Prev", use_container_width=True):
+                            st.session_state.query_page = page - 1
+                            st.session_state.query_pending = True
+                            st.rerun()
+                    with next_col:
+                        if response["has_more"] and st.button("Next ▶", use_container_width=True):
+                            st.session_state.query_page = page + 1
+                            st.session_state.query_pending = True
+                            st.rerun()
+
     st.markdown("---")
 
     # Bot istatistikleri
@@ -484,8 +538,141 @@ with st.sidebar:
 
     st.markdown("---")
 
+    # Bağlantı havuzu durumu
+    with st.expander("🔌 Connection Pool"):
+        metrics = pool_metrics()
+        if metrics:
+            st.markdown(f"""
+                <div class="graph-stats">
+                    <div class="mini-stat">
+                        <div class="mini-stat-number">{metrics['in_use']}/{metrics['max_size']}</div>
+                        <div class="mini-stat-label">In Use</div>
+                    </div>
+                    <div class="mini-stat">
+                        <div class="mini-stat-number">{metrics['idle']}</div>
+                        <div class="mini-stat-label">Idle</div>
+                    </div>
+                </div>
+            """, unsafe_allow_html=True)
+            st.caption(
+                f"Acquire wait: avg {metrics['avg_wait_seconds'] * 1000:.1f} ms, "
+                f"max {metrics['max_wait_seconds'] * 1000:.1f} ms · "
+                f"{metrics['acquisitions']:,} acquisitions, {metrics['failures']} failed"
+            )
+        else:
+            st.caption("The driver has not been created yet.")
+        plans = plan_cache.metrics()
+        if plans["executions"]:
+            st.caption(
+                f"Query plan reuse (estimated): {plans['hit_rate']:.0%} of {plans['executions']:,} queries, "
+                f"{plans['cached_plans']:,} distinct query texts"
+            )
+
+    # Yazma kuyruğu, yönlendirici ve cache sayaçları (sadece yüklenmiş bileşenler)
+    with st.expander("📈 Caches & Routing"):
+        components = component_metrics()
+        writer = components.get("history_writer")
+        if writer:
+            st.caption(
+                f"History writer: {writer['queue_depth']} queued "
+                f"(oldest {writer['oldest_pending_seconds']:.1f} s), lag last {writer['last_lag_seconds']:.2f} s / "
+                f"max {writer['max_lag_seconds']:.2f} s · {writer['written']:,} written in {writer['flushes']:,} flushes, "
+                f"{writer['failures']} failed, {writer['dropped']} dropped, {writer['blocked']} blocked"
+            )
+        router = components.get("router")
+        if router:
+            st.caption(
+                f"Router: {router['routed_ratio']:.0%} fast path ({router['routed']:,} routed, "
+                f"{router['fallbacks']:,} to the agent) · est. {router['estimated_saved_seconds']:.0f} s saved"
+            )
+        answers = components.get("answer_cache")
+        if answers:
+            st.caption(
+                f"Answer cache: {answers['hit_rate']:.0%} hits of {answers['hits'] + answers['misses']:,} lookups · "
+                f"{answers['entries']:,} entries, {answers['evictions']:,} evicted, {answers['invalidations']} invalidations"
+            )
+        templates = components.get("template_cache")
+        if templates:
+            st.caption(
+                f"Cypher templates: {templates['hit_rate']:.0%} hits · {templates['templates']:,} templates, "
+                f"{templates['learned']:,} learned, {templates['fallbacks']} fallbacks"
+            )
+        results = components.get("result_cache")
+        if results:
+            st.caption(
+                f"Cypher results: {results['hit_rate']:.0%} hits of {results['hits'] + results['misses']:,} queries · "
+                f"{results['entries']:,} entries, {results['stale']:,} stale, {results['evictions']:,} evicted"
+            )
+        embeddings = components.get("embeddings")
+        if embeddings:
+            st.caption(
+                f"Embedding cache: {embeddings['hit_rate']:.0%} hits · {embeddings['rows']:,} stored, "
+                f"{embeddings['requests']:,} API requests"
+            )
+        if not components:
+            st.caption("Nothing has been loaded yet.")
+
+    # Soğuk başlangıç süreleri
+    with st.expander("⏱️ Startup Profile"):
+        profile = startup_profile()
+        if profile:
+            st.dataframe(
+                pd.DataFrame(profile)[["name", "seconds", "status", "error"]],
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("Warm-up has not recorded anything yet.")
+
+    # İstek izleri: aşama süreleri ve son istekler
+    with st.expander("🔎 Request Traces"):
+        tracer = get_tracer()
+        all_sessions = st.checkbox("All sessions", value=False)
+        traces = tracer.recent(None if all_sessions else get_session_id(), limit=tracer.max_traces)
+        stages = tracer.stage_stats()
+        if stages:
+            st.dataframe(
+                pd.DataFrame.from_dict(stages, orient="index")[["count", "p50_ms", "p95_ms"]].round(1),
+                use_container_width=True,
+            )
+        if traces:
+            st.dataframe(
+                pd.DataFrame([{
+                    "question": t["question"][:40],
+                    "path": t["path"],
+                    "ms": round(t["duration_ms"]),
+                    "llm": t["llm_calls"],
+                    "tokens": t["prompt_tokens"] + t["completion_tokens"],
+                } for t in traces]),
+                use_container_width=True,
+                hide_index=True,
+            )
+            selected = st.selectbox(
+                "Trace",
+                range(len(traces)),
+                format_func=lambda i: f"{traces[i]['question'][:30]} · {traces[i]['duration_ms']:.0f} ms",
+            )
+            spans = pd.DataFrame(traces[selected]["spans"])
+            st.dataframe(
+                spans.drop(columns=[c for c in ("query", "params", "tool_input") if c in spans]).round(1),
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.download_button(
+                "⬇️ Export JSONL",
+                "\n".join(json.dumps(t, ensure_ascii=False, default=str) for t in traces),
+                file_name="traces.jsonl",
+                mime="application/jsonl",
+                use_container_width=True,
+            )
+        else:
+            st.caption("No requests traced yet.")
+        if tracer.export_path:
+            st.caption(f"{tracer.exported:,} traces appended to {tracer.export_path}")
+
     # Clear chat button
     if st.button("🗑️ Clear Chat", use_container_width=True):
+        flush_history()
         st.session_state.messages = [
             {"role": "assistant", "content": "Hi, I'm the NextLevelBot! 🎮 How can I help you with gaming today?"},
         ]
@@ -517,23 +704,39 @@ if "messages" not in st.session_state:
 
 # --- Mesaj Gönderimi ---
 def handle_submit(message):
-    # Loading animasyonu
-    loading_placeholder = st.empty()
-    loading_placeholder.markdown("""
-        <div class="loading-text">
-            🧠 Analyzing gaming data and generating response...
-        </div>
-    """, unsafe_allow_html=True)
-
-    try:
-        with st.spinner('Processing...'):
-            response = generate_response(message)
+    with st.chat_message('assistant'):
+        # Loading animasyonu
+        loading_placeholder = st.empty()
+        loading_placeholder.markdown("""
+            <div class="loading-text">
+                🧠 Analyzing gaming data and generating response...
+            </div>
+        """, unsafe_allow_html=True)
+        answer_placeholder = st.empty()
+
+        try:
+            streamed = ""
+            response = ""
+            for kind, value in stream_response(message):
+                if kind == "tool":
+                    loading_placeholder.caption(f"🔧 Using {value}...")
+                elif kind == "token":
+                    loading_placeholder.empty()
+                    streamed += value
+                    answer_placeholder.markdown(streamed + "▌")
+                elif kind == "done":
+                    response = value
+
+            # Sadece tamamlanmış cevap kaydedilir
+            loading_placeholder.empty()
+            answer_placeholder.markdown(response)
+            save_message('assistant', response)
             st.session_state.total_responses += 1
-            write_message('assistant', response)
-        loading_placeholder.empty()
-    except Exception as e:
-        loading_placeholder.empty()
-        write_message('assistant', f"🚫 Sorry, I encountered an error: {str(e)}")
+        except Exception as e:
+            loading_placeholder.empty()
+            response = f"🚫 Sorry, I encountered an error: {str(e)}"
+            answer_placeholder.markdown(response)
+            save_message('assistant', response)
 
 
 # --- Hızlı soru işleme ---
@@ -0,0 +1,110 @@
+import re
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, Query
+
+# EXPLAIN özetindeki sorgu tipleri: 'r' okuma, 'rw' / 'w' yazma, 's' şema değişikliği
+WRITE_QUERY_TYPES = {"rw", "w", "s"}
+PAGING_PATTERN = re.compile(r"\b(SKIP|OFFSET|LIMIT)\b", re.I)
+RETURN_PATTERN = re.compile(r"\bRETURN\b", re.I)
+
+
+def push_down_paging(query):
+    """
+    Sorgu tek bir RETURN ile bitiyor ve kendi SKIP/LIMIT'i yoksa sayfalamayı sorguya ekler.
+    (sorgu, sayfalama eklendi mi) döndürür.
+    """
+    query = query.strip().rstrip(";").strip()
+    returns = list(RETURN_PATTERN.finditer(query))
+    if not returns or PAGING_PATTERN.search(query[returns[-1].start():]) or re.search(r"\bUNION\b", query, re.I):
+        return query, False
+    return f"{query}\nSKIP $__skip LIMIT $__limit", True
+
+
+def inspect_plan(plan):
+    """Plan ağacındaki operatörleri ve en yüksek tahmini satır sayısını topla"""
+    operators, max_rows = set(), 0.0
+    stack = [plan] if plan else []
+    while stack:
+        node = stack.pop()
+        operators.add(node.get("operatorType", "").split("@")[0])
+        max_rows = max(max_rows, float(node.get("args", node.get("arguments", {})).get("EstimatedRows", 0) or 0))
+        stack.extend(node.get("children", []))
+    return {
+        "operators": operators,
+        "cartesian": any("CartesianProduct" in op for op in operators),
+        "estimated_rows": max_rows,
+    }
+
+
+def explain(session, query, params=None, timeout=10.0):
+    """Sorguyu çalıştırmadan EXPLAIN özetini döndür (plan ve query_type)"""
+    return session.run(Query("EXPLAIN " + query, timeout=timeout), params or {}).consume()
+
+
+def is_write(driver, query, database=None, timeout=10.0):
+    """
+    Sorgu tipini sunucuya sor: metindeki anahtar kelimelere bakmak string'lerde yanılır,
+    yazan prosedürleri (apoc.refactor.mergeNodes, apoc.cypher.runWrite...) kaçırır
+    """
+    with driver.session(database=database, default_access_mode=READ_ACCESS) as session:
+        return explain(session, query, timeout=timeout).query_type in WRITE_QUERY_TYPES
+
+
+def run_page(driver, query, page=0, page_size=5, max_estimated_rows=1_000_000,
+             timeout=10.0, fetch_size=100, allow_cartesian=False, allow_write=False, database=None):
+    """
+    Özel Cypher sorgusunu maliyet kontrolüyle çalıştırır ve tek bir sayfa döndürür.
+    Önce EXPLAIN ile plan ve sorgu tipi incelenir; kartezyen çarpım uyarı, tahmini
+    satır limiti aşımı ret sebebidir. Yazan sorgular allow_write verilmedikçe
+    reddedilir ve sayfalanmaz; onaysız sorgular okuma oturumunda çalışır. Sonuçlar
+    fetch_size'lık parçalarla akıtılır ve sayfa dolunca kalan kayıtlar sunucuda bırakılır.
+    """
+    response = {"rows": [], "has_more": False, "warnings": [], "error": None, "plan": None, "write": False}
+    paged_query, pushed_down = push_down_paging(query)
+    params = {"__skip": page * page_size, "__limit": page_size + 1} if pushed_down else {}
+
+    # Onaylanmamış sorgu okuma oturumunda çalışır; tip yanlış tahmin edilse de sunucu yazmayı reddeder
+    access_mode = WRITE_ACCESS if allow_write else READ_ACCESS
+    with driver.session(database=database, fetch_size=fetch_size, default_access_mode=access_mode) as session:
+        summary = explain(session, paged_query, params, timeout)
+        write = response["write"] = summary.query_type in WRITE_QUERY_TYPES
+        if write and not allow_write:
+            response["error"] = "Query refused: it writes to the database. Confirm the write to run it once."
+            return response
+        if write and page > 0:
+            response["error"] = "Write queries are not paged."
+            return response
+        if write and pushed_down:
+            # Yazan sorgu bir kez, sayfalamasız çalışır
+            paged_query, pushed_down, params = query.strip().rstrip(";").strip(), False, {}
+            summary = explain(session, paged_query, params, timeout)
+        response["plan"] = inspect_plan(summary.plan)
+
+        if response["plan"]["estimated_rows"] > max_estimated_rows:
+            response["error"] = (
+                f"Query refused: the plan estimates {response['plan']['estimated_rows']:,.0f} rows "
+                f"(limit {max_estimated_rows:,}). Add filters or a LIMIT."
+            )
+            return response
+        if response["plan"]["cartesian"]:
+            response["warnings"].append("The plan contains a cartesian product (disconnected MATCH patterns).")
+            if not allow_cartesian:
+                response["error"] = "Query needs confirmation because of the cartesian product."
+                return response
+        if write:
+            response["warnings"].append("This query writes to the database.")
+
+        result = session.run(Query(paged_query, timeout=timeout), params)
+        # Sayfalama sorguya eklenemediyse önceki sayfaları istemcide atla
+        skip = 0 if pushed_down else page * page_size
+        for index, record in enumerate(result):
+            if index < skip:
+                continue
+            if len(response["rows"]) == page_size:
+                # Yazan sorgu bir daha çalıştırılmayacağı için sonraki sayfa yok
+                response["has_more"] = not write
+                break
+            response["rows"].append(record.data())
+        result.consume()
+
+    return response
@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+
+import streamlit as st
+from db import READ, get_driver, get_database
+from startup import lazy
+
+logger = logging.getLogger(__name__)
+
+# Etiket / ilişki tipi başına sayaç; yazma yolları değiştirdikleri veriyi bildirir
+BUMP_QUERY = """
+UNWIND $labels AS label
+MERGE (v:DataVersion {label: label})
+SET v.version = coalesce(v.version, 0) + 1, v.updated_at = timestamp()
+RETURN v.label AS label, v.version AS version
+"""
+
+READ_QUERY = "MATCH (v:DataVersion) RETURN v.label AS label, v.version AS version"
+
+
+class DataVersions:
+    """
+    :DataVersion sayaçlarının process içi kopyası. En fazla check_interval
+    saniyede bir Neo4j'den okunur; bu process'teki bump'lar hemen görünür.
+    """
+
+    def __init__(self, driver, database, check_interval=2.0):
+        self.driver = driver
+        self.database = database
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._checked_at = 0.0
+
+    def current(self):
+        """Etiket -> sürüm sözlüğü"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    records, _, _ = self.driver.execute_query(READ_QUERY, database_=self.database, routing_=READ)
+                    self._merge({r["label"]: r["version"] for r in records})
+                    self._checked_at = time.monotonic()
+        return self._versions
+
+    def update(self, versions):
+        with self._lock:
+            self._merge(versions)
+
+    def _merge(self, versions):
+        # Sürümler sadece artar; eşzamanlı okuma eski bir değeri geri yazmasın
+        merged = dict(self._versions)
+        for label, version in versions.items():
+            merged[label] = max(version, merged.get(label, 0))
+        self._versions = merged
+
+
+@lazy("data versions")
+def get_data_versions():
+    return DataVersions(
+        get_driver(),
+        get_database(),
+        check_interval=float(st.secrets.get("DATA_VERSION_CHECK_INTERVAL", 2.0)),
+    )
+
+
+def bump(*labels):
+    """Verilen etiket/ilişki tiplerinin sürümünü artır; bunlara dayanan cache kayıtları geçersizleşir"""
+    labels = sorted(set(labels))
+    if not labels:
+        return {}
+    records, _, _ = get_driver().execute_query(BUMP_QUERY, {"labels": labels}, database_=get_database())
+    versions = {r["label"]: r["version"] for r in records}
+    if get_data_versions.ready:
+        get_data_versions().update(versions)
+    logger.debug("data version bumped: %s", versions)
+    return versions
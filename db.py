@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+from neo4j import GraphDatabase, Query, RoutingControl
+from startup import lazy
+from tracing import current_trace, loggable_params, span
+
+READ = RoutingControl.READ
+WRITE = RoutingControl.WRITE
+
+
+class PoolMonitor:
+    """Sürücünün bağlantı havuzundan bağlantı alma sürelerini ölçer"""
+
+    def __init__(self, driver):
+        self._pool = driver._pool
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.failures = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+        # Havuzun acquire'ını sarmala; sürücünün genel API'sinde bekleme süresi yok
+        acquire = self._pool.acquire
+
+        def timed_acquire(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return acquire(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                raise
+            finally:
+                self._record(time.perf_counter() - started)
+
+        self._pool.acquire = timed_acquire
+
+    def _record(self, seconds):
+        with self._lock:
+            self.acquisitions += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.last_wait_seconds = seconds
+
+    def metrics(self):
+        pool = self._pool
+        with pool.lock:
+            in_use = sum(c.in_use for conns in pool.connections.values() for c in conns)
+            total = sum(len(conns) for conns in pool.connections.values())
+            opening = sum(pool.connections_reservations.values())
+        with self._lock:
+            return {
+                "max_size": pool.pool_config.max_connection_pool_size,
+                "in_use": in_use,
+                "idle": total - in_use,
+                "opening": opening,
+                "acquisitions": self.acquisitions,
+                "failures": self.failures,
+                "last_wait_seconds": self.last_wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+                "avg_wait_seconds": self.total_wait_seconds / self.acquisitions if self.acquisitions else 0.0,
+            }
+
+
+class PlanCacheTracker:
+    """
+    Sunucunun sorgu planı cache'ini istemci tarafında taklit eder: aynı metin
+    son `capacity` farklı sorgu içinde daha önce görüldüyse plan yeniden
+    kullanılmış sayılır (Neo4j'nin varsayılan query_cache_size'ı 1000).
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._texts = OrderedDict()
+        self.executions = 0
+        self.hits = 0
+
+    def record(self, query):
+        with self._lock:
+            self.executions += 1
+            hit = query in self._texts
+            if hit:
+                self.hits += 1
+                self._texts.move_to_end(query)
+            else:
+                self._texts[query] = True
+                if len(self._texts) > self.capacity:
+                    self._texts.popitem(last=False)
+            return hit
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.executions if self.executions else 0.0,
+                "cached_plans": len(self._texts),
+            }
+
+
+plan_cache = PlanCacheTracker()
+
+
+@lazy("neo4j driver")
+def get_driver():
+    """UI, araçlar, hafıza ve betiklerin paylaştığı tek Neo4j sürücüsü (tek bağlantı havuzu)"""
+    driver = GraphDatabase.driver(
+        st.secrets["NEO4J_URI"],
+        auth=(st.secrets["NEO4J_USERNAME"], st.secrets["NEO4J_PASSWORD"]),
+        max_connection_pool_size=int(st.secrets.get("NEO4J_POOL_SIZE", 50)),
+        connection_acquisition_timeout=float(st.secrets.get("NEO4J_ACQUISITION_TIMEOUT", 30)),
+        max_connection_lifetime=float(st.secrets.get("NEO4J_CONNECTION_LIFETIME", 3600)),
+        liveness_check_timeout=float(st.secrets.get("NEO4J_LIVENESS_CHECK_TIMEOUT", 60)),
+    )
+    driver.verify_connectivity()
+    driver.monitor = PoolMonitor(driver)
+    return driver
+
+
+def get_database():
+    return st.secrets.get("NEO4J_DATABASE", "neo4j")
+
+
+def pool_metrics():
+    """Sürücü henüz oluşturulmadıysa None"""
+    if not get_driver.ready:
+        return None
+    return get_driver().monitor.metrics()
+
+
+def make_graph(routing=WRITE):
+    """Paylaşılan sürücüyü kullanan Neo4jGraph; okuma sorguları READ ile yönlendirilir"""
+    from langchain_neo4j import Neo4jGraph
+    from langchain_neo4j.graphs.neo4j_graph import value_sanitize
+
+    class SharedNeo4jGraph(Neo4jGraph):
+        # Üst sınıfın __init__'i kendi sürücüsünü açtığı için çağrılmıyor
+        def __init__(self, driver, database, routing, timeout=None, sanitize=False):
+            self._driver = driver
+            self._database = database
+            self._routing = routing
+            self.timeout = timeout
+            self.sanitize = sanitize
+            self._enhanced_schema = False
+            self.schema = ""
+            self.structured_schema = {}
+
+        def query(self, query, params={}):
+            with span("cypher", "write" if self._routing != READ else "read",
+                      query=query, params=loggable_params(params) if current_trace() else None) as attrs:
+                attrs["plan_reused"] = plan_cache.record(query)
+                if self._routing != READ:
+                    json_data = super().query(query, params)
+                    attrs["rows"] = len(json_data)
+                    return json_data
+                data, summary, _ = self._driver.execute_query(
+                    Query(text=query, timeout=self.timeout),
+                    database_=self._database,
+                    parameters_=params,
+                    routing_=READ,
+                )
+                # Sunucu tarafı süre: ilk kayda kadar + tüketme
+                attrs["db_ms"] = (summary.result_available_after or 0) + (summary.result_consumed_after or 0)
+                attrs["rows"] = len(data)
+                json_data = [r.data() for r in data]
+                if self.sanitize:
+                    json_data = [value_sanitize(el) for el in json_data]
+                return json_data
+
+    return SharedNeo4jGraph(get_driver(), get_database(), routing)
@@ -0,0 +1,112 @@
+import argparse
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tiktoken
+
+import data_version
+from graph import write_graph as graph
+from llm import base_embeddings
+
+# OpenAI embedding isteği sınırlarının biraz altında kalınır
+MAX_BATCH_TOKENS = 250_000
+MAX_BATCH_SIZE = 1000
+MAX_INPUT_TOKENS = 8191
+
+SCAN_QUERY = """
+MATCH (d:Description) WHERE d.text IS NOT NULL
+RETURN elementId(d) AS id, d.text AS text, d.text_hash AS text_hash, d.embedding IS NOT NULL AS has_embedding
+"""
+
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Description) WHERE elementId(d) = row.id
+SET d.embedding = row.embedding,
+    d.text_hash = row.text_hash,
+    d.embedded_at = timestamp()
+"""
+
+
+def text_hash(text, model):
+    """Metin + model adı; model değişince de yeniden embed edilir"""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def find_stale(model):
+    """Hash'i değişmiş ya da embedding'i olmayan Description'lar: [(id, text, hash)]"""
+    stale, scanned = [], 0
+    with graph._driver.session(database=graph._database, default_access_mode="READ") as session:
+        for record in session.run(SCAN_QUERY):
+            scanned += 1
+            current = text_hash(record["text"], model)
+            if current != record["text_hash"] or not record["has_embedding"]:
+                stale.append((record["id"], record["text"], current))
+    return stale, scanned
+
+
+def token_batches(items, encoding, max_tokens=MAX_BATCH_TOKENS, max_size=MAX_BATCH_SIZE):
+    """Toplam token sayısı ve eleman sayısı sınırına göre batch'lere böl"""
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = min(len(encoding.encode(item[1], disallowed_special=())), MAX_INPUT_TOKENS)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) == max_size):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def embed_batch(batch):
+    vectors = base_embeddings.embed_documents([text for _, text, _ in batch], chunk_size=len(batch))
+    rows = [{"id": id_, "embedding": vector, "text_hash": hash_} for (id_, _, hash_), vector in zip(batch, vectors)]
+    # Yazma da batch başına tek UNWIND transaction'ı
+    for start in range(0, len(rows), 500):
+        graph.query(WRITE_QUERY, {"rows": rows[start:start + 500]})
+    data_version.bump("Description")
+    return len(rows)
+
+
+def run(concurrency=4, max_tokens=MAX_BATCH_TOKENS, max_size=MAX_BATCH_SIZE):
+    model = base_embeddings.model
+    started = time.time()
+    stale, scanned = find_stale(model)
+    print(f"{scanned:,} descriptions scanned, {len(stale):,} need embedding")
+    if not stale:
+        return 0
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+
+    # Aynı anda en fazla 'concurrency' istek; bekleyen batch'ler de bununla sınırlı
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    embedded, calls = 0, 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for batch in token_batches(stale, encoding, max_tokens, max_size):
+            slots.acquire()
+            future = executor.submit(embed_batch, batch)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+            calls += 1
+        for future in futures:
+            embedded += future.result()
+
+    elapsed = time.time() - started
+    print(f"{embedded:,} descriptions embedded in {calls} batches, {elapsed:.1f}s")
+    return embedded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Değişen Description metinlerinin embedding'lerini güncelle")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    run(args.concurrency, args.max_batch_tokens, args.max_batch_size)
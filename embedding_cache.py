@@ -0,0 +1,200 @@
+import fcntl
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tracing import span
+
+
+def normalize_text(text):
+    """Cache anahtarı için boşlukları ve büyük/küçük harfi normalize et"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding'leri diskte float32 memory-mapped dosyada saklayan sarmalayıcı.
+    Vektörler append-only bir dosyada, anahtar -> satır eşlemesi SQLite index'te tutulur;
+    böylece yeniden başlatmalar ve tüm Streamlit process'leri aynı cache'i paylaşır.
+    """
+
+    def __init__(self, base, cache_dir, model_name=None, batch_window=0.01, max_batch_size=256):
+        self.base = base
+        self.model_name = model_name or getattr(base, "model", base.__class__.__name__)
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.lock_path = os.path.join(cache_dir, f"{slug}.lock")
+
+        self._db_lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, f"{slug}.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+        self._dim = self._read_dim()
+        self._mmap = None
+        self._mmap_rows = 0
+
+        # Eşzamanlı cache miss'leri tek bir embed_documents isteğinde topla
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._inflight = {}
+        self._flush_scheduled = False
+
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        # Cache miss'ler sağlayıcıya gider; izde ayrı görünsün
+        with span("embedding", self.model_name, texts=len(texts)) as attrs:
+            keys = [self._key(text) for text in texts]
+            found = self._lookup(keys)
+
+            results = [None] * len(texts)
+            missing = []
+            for i, key in enumerate(keys):
+                if key in found:
+                    results[i] = found[key]
+                else:
+                    missing.append(i)
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            attrs["misses"] = len(missing)
+
+            if missing:
+                futures = self._enqueue([(keys[i], texts[i]) for i in missing])
+                for i, future in zip(missing, futures):
+                    results[i] = future.result()
+
+            return results
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "requests": self.requests,
+            "rows": self._row_count(),
+        }
+
+    def _key(self, text):
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _enqueue(self, items):
+        futures = []
+        with self._pending_lock:
+            for key, text in items:
+                # Aynı metin zaten bekliyorsa aynı future paylaşılır
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    self._pending.append((key, text, future))
+                futures.append(future)
+            leader = not self._flush_scheduled
+            self._flush_scheduled = True
+
+        if leader:
+            time.sleep(self.batch_window)
+            self._flush()
+        return futures
+
+    def _flush(self):
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+            self._flush_scheduled = False
+
+        for start in range(0, len(batch), self.max_batch_size):
+            chunk = batch[start:start + self.max_batch_size]
+            try:
+                self.requests += 1
+                vectors = self.base.embed_documents([text for _, text, _ in chunk])
+                self._store([key for key, _, _ in chunk], vectors)
+            except Exception as e:
+                for key, _, future in chunk:
+                    self._inflight.pop(key, None)
+                    future.set_exception(e)
+                continue
+
+            for (key, _, future), vector in zip(chunk, vectors):
+                self._inflight.pop(key, None)
+                future.set_result(list(vector))
+
+    def _lookup(self, keys):
+        if self._dim is None:
+            self._dim = self._read_dim()
+            if self._dim is None:
+                return {}
+
+        unique = list(set(keys))
+        rows = {}
+        with self._db_lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self._db.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+
+        if not rows:
+            return {}
+        matrix = self._vectors(max(rows.values()) + 1)
+        return {key: matrix[row].tolist() for key, row in rows.items()}
+
+    def _vectors(self, min_rows):
+        # Dosya büyüdüyse yeniden map et
+        if self._mmap is None or self._mmap_rows < min_rows:
+            rows = os.path.getsize(self.vectors_path) // (self._dim * 4)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+            self._mmap_rows = rows
+        return self._mmap
+
+    def _store(self, keys, vectors):
+        data = np.asarray(vectors, dtype=np.float32)
+        with open(self.lock_path, "a") as lock_file:
+            # Process'ler arası yazma kilidi
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._db_lock:
+                    if self._dim is None:
+                        self._dim = self._read_dim() or data.shape[1]
+                        self._db.execute(
+                            "INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(self._dim),)
+                        )
+                    with open(self.vectors_path, "ab") as f:
+                        first_row = f.tell() // (self._dim * 4)
+                        f.write(data.tobytes())
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO vectors (key, row) VALUES (?, ?)",
+                        [(key, first_row + i) for i, key in enumerate(keys)],
+                    )
+                    self._db.commit()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_dim(self):
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _row_count(self):
+        with self._db_lock:
+            return self._db.execute("SELECT count(*) FROM vectors").fetchone()[0]
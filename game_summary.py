@@ -0,0 +1,168 @@
+import argparse
+import logging
+import time
+
+import data_version
+from graph import write_graph as graph
+
+logger = logging.getLogger(__name__)
+
+# Özeti etkileyen ilişki türleri
+SUMMARY_RELATIONSHIPS = ["PLAYED", "REVIEWS", "HAS_TAG", "SUPPORTS"]
+
+# Oyun başına saklanan en fazla öne çıkan inceleme sayısı ve sıralama ağırlıkları
+TOP_REVIEW_LIMIT = 10
+RECENCY_WEIGHT = 2.0
+RECENCY_HALF_LIFE_DAYS = 365.0
+
+SCHEMA_QUERIES = [
+    "CREATE INDEX game_summary_dirty IF NOT EXISTS FOR (g:Game) ON (g.summary_dirty)",
+    "CREATE INDEX top_review_rank IF NOT EXISTS FOR ()-[r:TOP_REVIEW]-() ON (r.rank)",
+]
+
+# Her oyun için etiket, platform, oyuncu ve inceleme özetini Game düğümüne yazar.
+# En faydalı ve en yeni incelemeler (g)-[:TOP_REVIEW {rank}]->(r) olarak işaretlenir,
+# böylece retriever tüm inceleme listesini değil sadece ilk K tanesini okur.
+REFRESH_QUERY = """
+UNWIND $app_ids AS app_id
+MATCH (g:Game {app_id: app_id})
+CALL {
+    WITH g
+    OPTIONAL MATCH (g)-[:HAS_TAG]->(t:Tag)
+    RETURN collect(DISTINCT t.name) AS tags
+}
+CALL {
+    WITH g
+    OPTIONAL MATCH (g)-[:SUPPORTS]->(p:Platform)
+    RETURN collect(DISTINCT p.name) AS platforms
+}
+CALL {
+    WITH g
+    OPTIONAL MATCH (g)-[:REVIEWS]-(r:Review)
+    RETURN count(r) AS reviews,
+           count(CASE WHEN r.is_recommended THEN 1 END) AS recommended,
+           sum(coalesce(r.helpful, 0)) AS helpful
+}
+CALL {
+    WITH g
+    MATCH (g)-[old:TOP_REVIEW]->()
+    DELETE old
+}
+CALL {
+    WITH g
+    MATCH (g)-[:REVIEWS]-(r:Review)
+    WITH g, r,
+         log(1 + coalesce(r.helpful, 0)) +
+         CASE WHEN r.date IS NULL THEN 0
+              ELSE $recency_weight * exp(-duration.inDays(date(r.date), date()).days / $half_life_days)
+         END AS rank_score
+    ORDER BY rank_score DESC
+    LIMIT $top_review_limit
+    WITH g, collect(r) AS top
+    UNWIND range(0, size(top) - 1) AS i
+    WITH g, top[i] AS r, i
+    CREATE (g)-[:TOP_REVIEW {rank: i}]->(r)
+}
+SET g.summary_tags = tags,
+    g.summary_platforms = platforms,
+    g.summary_player_count = COUNT { (g)<-[:PLAYED]-() },
+    g.summary_review_count = reviews,
+    g.summary_recommended_count = recommended,
+    g.summary_recommended_ratio = CASE WHEN reviews = 0 THEN null ELSE toFloat(recommended) / reviews END,
+    g.summary_helpful_total = helpful,
+    g.summary_dirty = false,
+    g.summary_updated_at = datetime()
+"""
+
+# İlişki eklenince/silinince ilgili oyunu kirli olarak işaretleyen APOC trigger'ı
+TRIGGER_STATEMENT = """
+UNWIND $createdRelationships + $deletedRelationships AS r
+WITH r WHERE type(r) IN ['PLAYED', 'REVIEWS', 'HAS_TAG', 'SUPPORTS']
+WITH startNode(r) AS s, endNode(r) AS e
+WITH CASE WHEN s:Game THEN s ELSE e END AS g
+WITH DISTINCT g WHERE g:Game
+SET g.summary_dirty = true
+"""
+
+
+def ensure_schema():
+    for query in SCHEMA_QUERIES:
+        graph.query(query)
+
+
+def mark_dirty(app_ids):
+    """Yazma yollarının çağırması için: verilen oyunların özetini yenilenecek olarak işaretle"""
+    graph.query(
+        "UNWIND $app_ids AS app_id MATCH (g:Game {app_id: app_id}) SET g.summary_dirty = true",
+        {"app_ids": list(app_ids)},
+    )
+
+
+def mark_all_dirty():
+    graph.query("""
+        MATCH (g:Game)
+        CALL { WITH g SET g.summary_dirty = true } IN TRANSACTIONS OF 10000 ROWS
+    """)
+
+
+def refresh_games(app_ids):
+    if app_ids:
+        graph.query(REFRESH_QUERY, {
+            "app_ids": list(app_ids),
+            "top_review_limit": TOP_REVIEW_LIMIT,
+            "recency_weight": RECENCY_WEIGHT,
+            "half_life_days": RECENCY_HALF_LIFE_DAYS,
+        })
+        data_version.bump("Game", "TOP_REVIEW")
+
+
+def refresh_dirty(batch_size=500):
+    """Kirli işaretli oyunların özetlerini batch'ler halinde yenile"""
+    # app_id'si olmayan oyun REFRESH_QUERY ile eşleşmez; bayrağı kalırsa döngü hiç bitmez
+    graph.query("MATCH (g:Game) WHERE g.summary_dirty = true AND g.app_id IS NULL SET g.summary_dirty = false")
+
+    refreshed, previous = 0, None
+    while True:
+        rows = graph.query(
+            "MATCH (g:Game) WHERE g.summary_dirty = true AND g.app_id IS NOT NULL "
+            "RETURN g.app_id AS app_id LIMIT $limit",
+            {"limit": batch_size},
+        )
+        app_ids = sorted(row["app_id"] for row in rows)
+        if not app_ids:
+            return refreshed
+        # Aynı batch tekrar geldiyse bayraklar temizlenemiyor demektir; sonsuz döngüye girme
+        if app_ids == previous:
+            logger.warning("game summary: %d games stay dirty after a refresh, stopping", len(app_ids))
+            return refreshed
+        refresh_games(app_ids)
+        refreshed += len(app_ids)
+        previous = app_ids
+
+
+def install_trigger(database="neo4j"):
+    """APOC trigger ile ilişki değişikliklerinde özetleri otomatik kirli işaretle"""
+    # apoc.trigger.install sadece system veritabanında çalışır
+    graph._driver.execute_query(
+        "CALL apoc.trigger.install($database, 'gameSummaryDirty', $statement, {phase: 'before'})",
+        {"database": database, "statement": TRIGGER_STATEMENT},
+        database_="system",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Game özet projeksiyonunu güncelle")
+    parser.add_argument("--all", action="store_true", help="Tüm oyunları yeniden hesapla")
+    parser.add_argument("--install-trigger", action="store_true", help="APOC trigger'ını kur")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    ensure_schema()
+    if args.install_trigger:
+        install_trigger()
+    if args.all:
+        mark_all_dirty()
+
+    started = time.time()
+    count = refresh_dirty(args.batch_size)
+    print(f"{count} game summaries refreshed in {time.time() - started:.1f}s")
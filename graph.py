@@ -1,9 +1,39 @@
+import os
 import streamlit as st
-from langchain_neo4j import Neo4jGraph
-
-# Connect to Neo4j
-graph = Neo4jGraph(
-    url=st.secrets["NEO4J_URI"],
-    username=st.secrets["NEO4J_USERNAME"],
-    password=st.secrets["NEO4J_PASSWORD"],
-)
+from startup import lazy
+
+
+@lazy("graph")
+def get_graph():
+    """Araçların kullandığı, okumaları READ ile yönlendiren Neo4jGraph (paylaşılan sürücü)"""
+    from db import READ, make_graph
+    from schema_snapshot import load_schema
+
+    graph = make_graph(routing=READ)
+
+    # Parmak izi değişmediyse tam şema taraması yapılmaz
+    load_schema(
+        graph,
+        st.secrets.get(
+            "SCHEMA_SNAPSHOT_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "schema_snapshot.json"),
+        ),
+    )
+    return graph
+
+
+@lazy("write graph")
+def get_write_graph():
+    """Yazma yapan betikler (yükleme, özet, embedding) için; şema okunmaz"""
+    from db import WRITE, make_graph
+
+    return make_graph(routing=WRITE)
+
+
+def __getattr__(name):
+    # `from graph import graph` kullanımları ilk erişimde bağlantıyı kurar
+    if name == "graph":
+        return get_graph()
+    if name == "write_graph":
+        return get_write_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
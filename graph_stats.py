@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EMPTY_STATS = {"nodes": 0, "relationships": 0, "node_types": [], "rel_types": [], "refreshed_at": None}
+
+
+def _quote(name):
+    return "`" + name.replace("`", "``") + "`"
+
+
+def read_count_store(driver, database=None):
+    """
+    Tüm sayıları Neo4j'nin count store'undan okur: etiket/ilişki tipi başına
+    count() sorguları graf taranmadan sabit sürede cevaplanır.
+    """
+    with driver.session(database=database, default_access_mode="READ") as session:
+        nodes = session.run("MATCH (n) RETURN count(n) AS count").single()["count"]
+        relationships = session.run("MATCH ()-[r]->() RETURN count(r) AS count").single()["count"]
+        labels = [r["label"] for r in session.run("CALL db.labels() YIELD label RETURN label")]
+        types = [r["relationshipType"] for r in session.run(
+            "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+        )]
+
+        node_types = []
+        if labels:
+            query = " UNION ALL ".join(
+                f"MATCH (n:{_quote(label)}) RETURN {i} AS i, count(n) AS count" for i, label in enumerate(labels)
+            )
+            node_types = [{"labels": [labels[r["i"]]], "count": r["count"]} for r in session.run(query)]
+
+        rel_types = []
+        if types:
+            query = " UNION ALL ".join(
+                f"MATCH ()-[r:{_quote(rel_type)}]->() RETURN {i} AS i, count(r) AS count" for i, rel_type in enumerate(types)
+            )
+            rel_types = [{"type": types[r["i"]], "count": r["count"]} for r in session.run(query)]
+
+    return {
+        "nodes": nodes,
+        "relationships": relationships,
+        "node_types": sorted(node_types, key=lambda x: x["count"], reverse=True),
+        "rel_types": sorted(rel_types, key=lambda x: x["count"], reverse=True),
+        "refreshed_at": time.time(),
+    }
+
+
+class GraphStatsService:
+    """
+    Tüm Streamlit oturumlarının paylaştığı istatistik servisi. Tek bir arka plan
+    thread'i belirli aralıklarla yeniler; okuyucular her zaman son anlık görüntüyü
+    alır, böylece süre dolduğunda aynı anda veritabanına yüklenme olmaz.
+    """
+
+    def __init__(self, driver, database=None, refresh_interval=300):
+        self._driver = driver
+        self._database = database
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self.last_error = None
+        self.refresh_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="graph-stats", daemon=True)
+        self._thread.start()
+
+    def get(self, timeout=10.0):
+        """Son anlık görüntü; ilk yükleme bitene kadar en fazla timeout kadar bekler"""
+        self._ready.wait(timeout)
+        return self._snapshot or EMPTY_STATS
+
+    def refresh(self, wait=True, timeout=10.0):
+        """Arka plan thread'ine hemen yenilemesini söyle"""
+        self._ready.clear()
+        self._wake.set()
+        if wait:
+            self._ready.wait(timeout)
+
+    def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                self._snapshot = read_count_store(self._driver, self._database)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("graph stats refresh failed: %s", e)
+            self.refresh_seconds = time.perf_counter() - started
+            self._ready.set()
+
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
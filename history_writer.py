@@ -0,0 +1,177 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Her oturumun mesajlarını sırasıyla Message zincirine ekler (Neo4jChatMessageHistory ile aynı yapı)
+FLUSH_QUERY = """
+UNWIND $sessions AS session
+MERGE (s:`{label}` {{id: session.id}})
+WITH s, session
+OPTIONAL MATCH (s)-[lm:LAST_MESSAGE]->(last_message)
+DELETE lm
+WITH s, session, last_message
+CALL {{
+    WITH session
+    UNWIND range(0, size(session.messages) - 1) AS i
+    CREATE (m:Message {{type: session.messages[i].type, content: session.messages[i].content}})
+    RETURN collect(m) AS created
+}}
+FOREACH (i IN range(0, size(created) - 2) |
+    FOREACH (a IN [created[i]] | FOREACH (b IN [created[i + 1]] | CREATE (a)-[:NEXT]->(b))))
+FOREACH (first IN CASE WHEN last_message IS NULL THEN [] ELSE [created[0]] END |
+    CREATE (last_message)-[:NEXT]->(first))
+FOREACH (newest IN [created[-1]] | CREATE (s)-[:LAST_MESSAGE]->(newest))
+SET s.message_count = coalesce(s.message_count, 0) + size(created)
+RETURN s.id AS session_id, s.message_count AS message_count,
+       coalesce(s.summarized_count, 0) AS summarized_count
+"""
+
+MAX_ATTEMPTS = 3
+
+
+class HistoryWriter:
+    """
+    Sohbet mesajlarını sınırlı bir kuyrukta toplayıp arka plan thread'inde
+    batch'li UNWIND transaction'ları ile Neo4j'ye yazan write-behind katmanı.
+    """
+
+    def __init__(self, driver, database, node_label="Session", max_queue=1000, batch_size=100, flush_interval=0.5):
+        self._driver = driver
+        self._database = database
+        self._query = FLUSH_QUERY.format(label=node_label)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        # Kuyruk dolu olduğu için beklemek zorunda kalan submit çağrıları
+        self.blocked = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+        # Mesajın kuyruğa girişinden kalıcı olarak yazılmasına kadar geçen süre
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, history, message):
+        """
+        Mesajı kuyruğa ekler; kuyruk doluysa worker yer açana kadar bekler.
+        Mesajlar sadece worker tarafından yazılır, böylece bir oturumun
+        mesajları sırasıyla ve tek transaction akışıyla kaydedilir.
+        """
+        item = ("message", history, message, time.monotonic())
+        try:
+            self._queue.put(item, timeout=1.0)
+        except queue.Full:
+            self.blocked += 1
+            logger.warning("history writer: queue full, waiting for the worker to drain it")
+            self._queue.put(item)
+
+    def flush(self, timeout=10.0):
+        """Kuyruktaki her şey yazılana kadar bekle (oturum sonu / temizleme için)"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+    def metrics(self):
+        with self._queue.mutex:
+            oldest = next((item[3] for item in self._queue.queue if item[0] == "message"), None)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "oldest_pending_seconds": time.monotonic() - oldest if oldest is not None else 0.0,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "avg_flush_seconds": self._total_flush_seconds / self.flushes if self.flushes else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                messages = [item for item in batch if item[0] == "message"]
+                if messages:
+                    self._write(messages)
+            except Exception:
+                # Thread ölürse kuyruk bir daha boşalmaz; hatayı say ve devam et
+                self.failures += 1
+                logger.exception("history writer: batch failed")
+            finally:
+                for item in batch:
+                    if item[0] == "flush":
+                        item[1].set()
+
+    def _write(self, items):
+        sessions, histories = {}, {}
+        for _, history, message, _ in items:
+            session_id = history._session_id
+            sessions.setdefault(session_id, {"id": session_id, "messages": []})["messages"].append(
+                {"type": message.type, "content": message.content}
+            )
+            histories[session_id] = history
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                records, _, _ = self._driver.execute_query(
+                    self._query, {"sessions": list(sessions.values())}, database_=self._database
+                )
+                break
+            except Exception as e:
+                self.failures += 1
+                logger.warning("history writer: flush attempt %d failed: %s", attempt, e)
+                time.sleep(0.5 * attempt)
+        else:
+            self.dropped += len(items)
+            logger.error("history writer: dropped %d messages after %d attempts", len(items), MAX_ATTEMPTS)
+            return
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.written += len(items)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._total_flush_seconds += elapsed
+        self.last_lag_seconds = time.monotonic() - min(item[3] for item in items)
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+
+        for record in records:
+            history = histories.get(record["session_id"])
+            if history is not None:
+                history.after_flush(record["message_count"], record["summarized_count"])
@@ -0,0 +1,284 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+
+import data_version
+import schema_bootstrap
+from graph import write_graph as graph
+
+csv.field_size_limit(sys.maxsize)
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ingest_checkpoint.json")
+
+PLATFORMS = ["Windows", "Mac", "Linux", "Steam Deck"]
+
+# Sırayla çalışan adımlar: önce düğümler, sonra ilişkiler.
+# key: aynı düğüme dokunan satırlar aynı worker'a gitsin diye bölümleme sütunu
+# labels: adımın yazdığı etiket/ilişki tipleri; sürümleri artırılınca Cypher sonuç cache'i yenilenir
+STEPS = [
+    {
+        "name": "games",
+        "file": "games.csv",
+        "key": "app_id",
+        "labels": ["Game"],
+        "query": """
+UNWIND $rows AS row
+MERGE (g:Game {app_id: toInteger(row.app_id)})
+SET g.title = row.title,
+    g.release_date = row.date_release,
+    g.rating = row.rating,
+    g.positive_ratio = toInteger(row.positive_ratio),
+    g.user_reviews = toInteger(row.user_reviews),
+    g.price = toFloat(row.price_final),
+    g.summary_dirty = true
+""",
+    },
+    {
+        "name": "users",
+        "file": "users.csv",
+        "key": "user_id",
+        "labels": ["User"],
+        "query": """
+UNWIND $rows AS row
+MERGE (u:User {user_id: toInteger(row.user_id)})
+SET u.username = coalesce(row.username, u.username),
+    u.products = toInteger(row.products),
+    u.review_count = toInteger(row.reviews)
+""",
+    },
+    {
+        "name": "tag_nodes",
+        "file": "tags.csv",
+        "key": "tag",
+        "labels": ["Tag"],
+        "query": """
+UNWIND $rows AS row
+WITH DISTINCT row.tag AS name WHERE name IS NOT NULL AND name <> ''
+MERGE (:Tag {name: name})
+""",
+    },
+    {
+        "name": "game_platforms",
+        "file": "games.csv",
+        "key": "app_id",
+        "labels": ["SUPPORTS"],
+        "query": """
+UNWIND $rows AS row
+MATCH (g:Game {app_id: toInteger(row.app_id)})
+UNWIND [pair IN [['Windows', row.win], ['Mac', row.mac], ['Linux', row.linux], ['Steam Deck', row.steam_deck]]
+        WHERE toLower(coalesce(pair[1], '')) = 'true' | pair[0]] AS platform
+MATCH (p:Platform {name: platform})
+MERGE (g)-[:SUPPORTS]->(p)
+""",
+    },
+    {
+        "name": "game_tags",
+        "file": "tags.csv",
+        "key": "app_id",
+        "labels": ["HAS_TAG"],
+        "query": """
+UNWIND $rows AS row
+MATCH (g:Game {app_id: toInteger(row.app_id)})
+MATCH (t:Tag {name: row.tag})
+MERGE (g)-[:HAS_TAG]->(t)
+""",
+    },
+    {
+        "name": "descriptions",
+        "file": "descriptions.csv",
+        "key": "app_id",
+        "labels": ["Description", "HAS_DESCRIPTION"],
+        "query": """
+UNWIND $rows AS row
+MATCH (g:Game {app_id: toInteger(row.app_id)})
+MERGE (g)-[:HAS_DESCRIPTION]->(d:Description)
+SET d.text = row.description
+""",
+    },
+    {
+        "name": "recommendations",
+        "file": "recommendations.csv",
+        "key": "app_id",
+        "labels": ["User", "Review", "WROTE_REVIEW", "REVIEWS", "PLAYED"],
+        "query": """
+UNWIND $rows AS row
+MATCH (g:Game {app_id: toInteger(row.app_id)})
+MERGE (u:User {user_id: toInteger(row.user_id)})
+MERGE (r:Review {review_id: toInteger(row.review_id)})
+SET r.is_recommended = toLower(row.is_recommended) = 'true',
+    r.helpful = toInteger(row.helpful),
+    r.funny = toInteger(row.funny),
+    r.date = row.date,
+    r.hours = toFloat(row.hours)
+MERGE (u)-[:WROTE_REVIEW]->(r)
+MERGE (r)-[:REVIEWS]->(g)
+MERGE (u)-[p:PLAYED]->(g)
+SET p.total_playtime = toFloat(row.hours),
+    // CSV'de sütun varsa haftalık gün sayısı
+    p.days_per_week = coalesce(toInteger(row.days_per_week), p.days_per_week)
+""",
+    },
+    {
+        # İsteğe bağlı: user_id,friend_id satırları (dosya yoksa adım atlanır)
+        "name": "friends",
+        "file": "friends.csv",
+        "key": "user_id",
+        "labels": ["FRIENDS_WITH"],
+        "query": """
+UNWIND $rows AS row
+MATCH (a:User {user_id: toInteger(row.user_id)})
+MATCH (b:User {user_id: toInteger(row.friend_id)})
+MERGE (a)-[:FRIENDS_WITH]->(b)
+""",
+    },
+]
+
+
+class Checkpoint:
+    """Adım başına dosya konumu ve işlenen satır sayısı; kesilen yükleme buradan devam eder"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def get(self, step):
+        return self.state.get(step, {"offset": None, "rows": 0, "done": False})
+
+    def save(self, step, offset, rows, done=False):
+        self.state[step] = {"offset": offset, "rows": rows, "done": done}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+def _partition(value, workers):
+    return zlib.crc32(str(value).encode("utf-8")) % workers
+
+
+def _worker(tasks, query, errors):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        rows, done = task
+        try:
+            # execute_write deadlock gibi geçici hataları kendisi tekrar dener
+            with graph._driver.session(database=graph._database) as session:
+                session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.release()
+
+
+def run_step(step, data_dir, checkpoint, batch_size=5000, workers=4):
+    """
+    CSV'yi parça parça okuyup bölümlere ayırır ve worker'lara UNWIND batch'leri olarak dağıtır.
+    Her parça (batch_size * workers satır) tamamen yazıldıktan sonra checkpoint alınır;
+    bellekte aynı anda en fazla bir parça tutulur.
+    """
+    path = os.path.join(data_dir, step["file"])
+    if not os.path.exists(path):
+        print(f"[{step['name']}] {path} not found, skipped")
+        return
+    state = checkpoint.get(step["name"])
+    if state["done"]:
+        print(f"[{step['name']}] already loaded, skipped")
+        return
+
+    tasks = [queue.Queue(maxsize=2) for _ in range(workers)]
+    errors = []
+    threads = [
+        threading.Thread(target=_worker, args=(tasks[i], step["query"], errors), daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    rows_done = state["rows"]
+    started, loaded = time.time(), 0
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            # readline ile okununca tell() kullanılabilir ve csv.reader ileriyi okumaz
+            lines = iter(f.readline, "")
+            header = next(csv.reader([next(lines)]))
+            if state["offset"] is not None:
+                f.seek(state["offset"])
+            reader = csv.DictReader(lines, fieldnames=header)
+
+            while True:
+                partitions = [[] for _ in range(workers)]
+                count = 0
+                for row in reader:
+                    partitions[_partition(row.get(step["key"]), workers)].append(row)
+                    count += 1
+                    if count == batch_size * workers:
+                        break
+                if not count:
+                    break
+
+                done = threading.Semaphore(0)
+                submitted = 0
+                for i, rows in enumerate(partitions):
+                    for start in range(0, len(rows), batch_size):
+                        tasks[i].put((rows[start:start + batch_size], done))
+                        submitted += 1
+                for _ in range(submitted):
+                    done.acquire()
+                if errors:
+                    raise errors[0]
+
+                rows_done += count
+                loaded += count
+                data_version.bump(*step["labels"])
+                checkpoint.save(step["name"], f.tell(), rows_done)
+                elapsed = time.time() - started
+                print(f"[{step['name']}] {rows_done:,} rows ({loaded / elapsed:,.0f} rows/s)")
+    finally:
+        for task_queue in tasks:
+            task_queue.put(None)
+
+    checkpoint.save(step["name"], None, rows_done, done=True)
+    elapsed = time.time() - started
+    print(f"[{step['name']}] done: {loaded:,} rows in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def ensure_constraints():
+    # Kısıtlar ve sorguların kullandığı index'ler tek yerde: schema_bootstrap.SCHEMA_ITEMS
+    schema_bootstrap.bootstrap()
+    graph.query("UNWIND $names AS name MERGE (:Platform {name: name})", {"names": PLATFORMS})
+    data_version.bump("Platform")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV veri setini Neo4j'ye toplu yükle")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--only", nargs="*", choices=[step["name"] for step in STEPS], help="Sadece bu adımları çalıştır")
+    parser.add_argument("--restart", action="store_true", help="Checkpoint'i yok say ve baştan yükle")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+
+    ensure_constraints()
+    started = time.time()
+    for step in STEPS:
+        if args.only and step["name"] not in args.only:
+            continue
+        run_step(step, args.data_dir, checkpoint, args.batch_size, args.workers)
+    print(f"ingestion finished in {time.time() - started:.1f}s; run 'python game_summary.py --all' to refresh the summaries")
@@ -1,16 +1,56 @@
+import os
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-
-# Create the LLM
-llm = ChatOpenAI(
-    openai_api_key=st.secrets["OPENAI_API_KEY"],
-    model=st.secrets["OPENAI_MODEL"],
-    temperature=0,
-    max_tokens=4000,
-)
-
-# Create the Embedding model
-embeddings = OpenAIEmbeddings(
-    openai_api_key=st.secrets["OPENAI_API_KEY"]
-)
\ No newline at end of file
+from startup import lazy
+
+
+@lazy("llm")
+def get_llm():
+    from langchain_openai import ChatOpenAI
+
+    # Create the LLM
+    return ChatOpenAI(
+        openai_api_key=st.secrets["OPENAI_API_KEY"],
+        model=st.secrets["OPENAI_MODEL"],
+        temperature=0,
+        max_tokens=4000,
+        streaming=True,  # Final Answer token'larının UI'a akması için
+        stream_usage=True,  # Akışta da token kullanımı gelsin (izleme için)
+    )
+
+
+@lazy("embeddings")
+def get_base_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+
+    # Create the Embedding model
+    return OpenAIEmbeddings(
+        openai_api_key=st.secrets["OPENAI_API_KEY"]
+    )
+
+
+@lazy("embedding cache")
+def get_embeddings():
+    from embedding_cache import CachedEmbeddings
+
+    # Sorgu embedding'leri diskte cache'leniyor (tüm process'ler arasında paylaşılır)
+    return CachedEmbeddings(
+        get_base_embeddings(),
+        cache_dir=st.secrets.get(
+            "EMBEDDING_CACHE_DIR",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings"),
+        ),
+    )
+
+
+_lazy_attributes = {
+    "llm": get_llm,
+    "base_embeddings": get_base_embeddings,
+    "embeddings": get_embeddings,
+}
+
+
+def __getattr__(name):
+    # `from llm import llm, embeddings` kullanımları ilk erişimde nesneyi oluşturur
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
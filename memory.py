@@ -0,0 +1,255 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage, get_buffer_string, messages_from_dict
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_neo4j import Neo4jChatMessageHistory
+from neo4j import RoutingControl
+
+SUMMARY_TEMPLATE = """Progressively summarize the conversation between a user and NextLevelBot, a video game assistant.
+Keep the user's preferences, the games, users and facts that were mentioned. Use at most 120 words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+# Özetleme cevabı geciktirmesin diye arka planda, oturum başına sırayla yapılır
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+
+class SummarizedNeo4jChatMessageHistory(Neo4jChatMessageHistory):
+    """
+    Son N turu olduğu gibi tutan, daha eski turları Session düğümündeki
+    rolling summary'ye katlayan sohbet geçmişi. Okuma tek sorguda sadece
+    pencereyi ve özeti getirir; sonuç token bütçesine sığacak şekilde kırpılır.
+    """
+
+    def __init__(self, session_id, graph, llm, window=3, token_budget=1500, node_label="Session"):
+        # Üst sınıfın kurucusu Session düğümünü varsayılan veritabanına yazıyor; alanlar burada kuruluyor
+        if not session_id:
+            raise ValueError("Please ensure that the session_id parameter is provided")
+        self._driver = graph._driver
+        self._database = graph._database
+        self._session_id = session_id
+        self._node_label = node_label
+        self._window = window
+        self._driver.execute_query(
+            f"MERGE (s:`{self._node_label}` {{id:$session_id}})",
+            {"session_id": self._session_id},
+            database_=self._database,
+        )
+        self._llm = llm
+        self._token_budget = token_budget
+        self._summary_chain = PromptTemplate.from_template(SUMMARY_TEMPLATE) | llm | StrOutputParser()
+
+    @property
+    def messages(self):
+        summary, messages = self._load()
+        return self._render(summary, messages)
+
+    def _load(self):
+        """(özet, pencere mesajları) tek sorguda okunur"""
+        query = (
+            f"MATCH (s:`{self._node_label}`) WHERE s.id = $session_id "
+            "OPTIONAL MATCH (s)-[:LAST_MESSAGE]->(last_message) "
+            "OPTIONAL MATCH p=(last_message)<-[:NEXT*0.."
+            f"{self._window * 2}]-() "
+            "WITH s, p ORDER BY length(p) DESC LIMIT 1 "
+            "RETURN s.summary AS summary, "
+            "coalesce([node IN reverse(nodes(p)) | "
+            "{data:{content: node.content}, type: node.type}], []) AS messages"
+        )
+        records, _, _ = self._driver.execute_query(
+            query, {"session_id": self._session_id}, database_=self._database, routing_=RoutingControl.READ
+        )
+        if not records:
+            return None, []
+        return records[0]["summary"], messages_from_dict(records[0]["messages"])
+
+    def _render(self, summary, messages):
+        # Token bütçesi aşılıyorsa pencerenin en eski mesajlarını at
+        summary_tokens = self._llm.get_num_tokens(summary) if summary else 0
+        while messages and summary_tokens + self._llm.get_num_tokens(get_buffer_string(messages)) > self._token_budget:
+            messages = messages[1:]
+
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + messages
+        return messages
+
+    @messages.setter
+    def messages(self, messages):
+        raise NotImplementedError(
+            "Direct assignment to 'messages' is not allowed."
+            " Use the 'add_messages' instead."
+        )
+
+    def add_message(self, message):
+        query = (
+            f"MATCH (s:`{self._node_label}`) WHERE s.id = $session_id "
+            "OPTIONAL MATCH (s)-[lm:LAST_MESSAGE]->(last_message) "
+            "CREATE (s)-[:LAST_MESSAGE]->(new:Message) "
+            "SET new += {type:$type, content:$content}, "
+            "s.message_count = coalesce(s.message_count, 0) + 1 "
+            "WITH s, new, lm, last_message "
+            "FOREACH (_ IN CASE WHEN last_message IS NULL THEN [] ELSE [1] END | "
+            "CREATE (last_message)-[:NEXT]->(new)) "
+            "DELETE lm "
+            "RETURN s.message_count AS message_count, "
+            "coalesce(s.summarized_count, 0) AS summarized_count"
+        )
+        records, _, _ = self._driver.execute_query(
+            query,
+            {"type": message.type, "content": message.content, "session_id": self._session_id},
+            database_=self._database,
+        )
+
+        self._schedule_fold(records[0]["message_count"], records[0]["summarized_count"])
+
+    def _schedule_fold(self, message_count, summarized_count):
+        # Pencereden taşan en az bir tam tur varsa özete katla
+        if message_count - summarized_count - self._window * 2 >= 2:
+            _summary_executor.submit(self._fold)
+
+    def clear(self):
+        # Üst sınıfın clear'ı veritabanı vermeden siliyor; aynı sorgu burada
+        self._driver.execute_query(
+            f"MATCH (s:`{self._node_label}`)-[:LAST_MESSAGE]->(last_message) "
+            "WHERE s.id = $session_id MATCH p=(last_message)<-[:NEXT]-() "
+            "WITH p, length(p) AS length ORDER BY length DESC LIMIT 1 "
+            "UNWIND nodes(p) as node DETACH DELETE node",
+            {"session_id": self._session_id},
+            database_=self._database,
+        )
+        self._driver.execute_query(
+            f"MATCH (s:`{self._node_label}`) WHERE s.id = $session_id "
+            "REMOVE s.summary, s.message_count, s.summarized_count",
+            {"session_id": self._session_id},
+            database_=self._database,
+        )
+
+    def _fold(self):
+        # Sıradaki katlama çalışana kadar sayılar değişmiş olabilir; güncel hâlini oku
+        records, _, _ = self._driver.execute_query(
+            f"MATCH (s:`{self._node_label}`) WHERE s.id = $session_id "
+            "RETURN coalesce(s.message_count, 0) - coalesce(s.summarized_count, 0) AS unsummarized",
+            {"session_id": self._session_id},
+            database_=self._database,
+        )
+        pending = records[0]["unsummarized"] - self._window * 2 if records else 0
+        if pending < 2:
+            return
+
+        # Son mesajdan geriye doğru pencere + bekleyen mesajlar kadar yol; en eski 'pending' tanesi özetlenir
+        query = (
+            f"MATCH (s:`{self._node_label}`)-[:LAST_MESSAGE]->(last_message) "
+            "WHERE s.id = $session_id "
+            f"MATCH p=(last_message)<-[:NEXT*{self._window * 2 + pending - 1}]-() "
+            "RETURN s.summary AS summary, "
+            "[node IN reverse(nodes(p))[..$pending] | {data:{content: node.content}, type: node.type}] AS messages"
+        )
+        records, _, _ = self._driver.execute_query(
+            query, {"session_id": self._session_id, "pending": pending}, database_=self._database
+        )
+        if not records:
+            return
+
+        summary = self._summary_chain.invoke({
+            "summary": records[0]["summary"] or "(empty)",
+            "lines": get_buffer_string(messages_from_dict(records[0]["messages"])),
+        })
+        self._driver.execute_query(
+            f"MATCH (s:`{self._node_label}`) WHERE s.id = $session_id "
+            "SET s.summary = $summary, s.summarized_count = coalesce(s.summarized_count, 0) + $pending",
+            {"session_id": self._session_id, "summary": summary, "pending": pending},
+            database_=self._database,
+        )
+        return summary
+
+    def __del__(self):
+        # Sürücü paylaşılan Neo4jGraph'a ait; üst sınıf gibi kapatmıyoruz
+        pass
+
+
+# Aktif oturumların pencere + özet kopyası (process içinde)
+_session_cache = OrderedDict()
+_session_cache_lock = threading.Lock()
+MAX_CACHED_SESSIONS = 500
+
+
+class WriteBehindChatMessageHistory(SummarizedNeo4jChatMessageHistory):
+    """
+    Mesajları process içindeki pencereye ekleyip hemen dönen, Neo4j'ye yazmayı
+    HistoryWriter'ın arka plan batch'lerine bırakan sohbet geçmişi.
+    Aktif oturumun okumaları veritabanına gitmeden bellekten yapılır.
+    """
+
+    def __init__(self, session_id, graph, llm, writer, window=3, token_budget=1500, node_label="Session"):
+        # Session düğümü ilk flush'ta MERGE edilir; her turda senkron yazma yapılmaz
+        if not session_id:
+            raise ValueError("Please ensure that the session_id parameter is provided")
+        self._driver = graph._driver
+        self._database = graph._database
+        self._session_id = session_id
+        self._node_label = node_label
+        self._window = window
+        self._llm = llm
+        self._token_budget = token_budget
+        self._summary_chain = PromptTemplate.from_template(SUMMARY_TEMPLATE) | llm | StrOutputParser()
+        self._writer = writer
+
+    @property
+    def messages(self):
+        state = self._state()
+        return self._render(state["summary"], list(state["messages"]))
+
+    @messages.setter
+    def messages(self, messages):
+        raise NotImplementedError(
+            "Direct assignment to 'messages' is not allowed."
+            " Use the 'add_messages' instead."
+        )
+
+    def add_message(self, message):
+        state = self._state()
+        with _session_cache_lock:
+            state["messages"].append(message)
+            del state["messages"][:-self._window * 2]
+        self._writer.submit(self, message)
+
+    def after_flush(self, message_count, summarized_count):
+        """HistoryWriter yazdıktan sonra çağırır"""
+        self._schedule_fold(message_count, summarized_count)
+
+    def clear(self):
+        self._writer.flush()
+        super().clear()
+        with _session_cache_lock:
+            _session_cache.pop(self._session_id, None)
+
+    def _fold(self):
+        summary = super()._fold()
+        if summary is not None:
+            with _session_cache_lock:
+                state = _session_cache.get(self._session_id)
+                if state is not None:
+                    state["summary"] = summary
+
+    def _state(self):
+        with _session_cache_lock:
+            state = _session_cache.get(self._session_id)
+            if state is not None:
+                _session_cache.move_to_end(self._session_id)
+                return state
+
+        summary, messages = self._load()
+        with _session_cache_lock:
+            state = _session_cache.setdefault(self._session_id, {"summary": summary, "messages": messages})
+            while len(_session_cache) > MAX_CACHED_SESSIONS:
+                _session_cache.popitem(last=False)
+            return state
@@ -0,0 +1,133 @@
+import contextvars
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from router import ROUTE_RULES
+
+logger = logging.getLogger(__name__)
+
+# Süre sınırının sentez adımına ayrılan payı
+SYNTHESIS_SHARE = 0.25
+
+CONJUNCTION_PATTERN = re.compile(r"\b(and|also|plus|then)\b|[;,]", re.I)
+
+PLAN_TEMPLATE = """You split a user's question about video games into independent tool calls.
+
+Available tools:
+- "Game Search": finds games by description, genre, tags or similarity.
+- "Graph Info": answers database questions about users, friends, play history, platforms, tags and rankings.
+
+Rules:
+- Return a JSON list of objects with "tool" and "input" keys, at most {max_steps} items.
+- Each "input" must be a self-contained question that can be answered without the other results.
+- If the question cannot be split into independent parts, return a list with a single item.
+- Output ONLY the JSON list.
+
+Question: {question}"""
+
+SYNTHESIS_TEMPLATE = """You are NextLevelBot, an intelligent assistant that helps users explore and learn about video games.
+
+Answer the user's question using ONLY the tool results below.
+If a result is empty or says nothing was found, state that you could not find that information in the database.
+Do not use your own knowledge. If a result is a list, format it as bullet points.
+
+{observations}
+
+Question: {question}
+Answer:"""
+
+
+class ParallelPlanner:
+    """
+    Çok parçalı soruları bağımsız araç çağrılarına böler, bunları thread havuzunda
+    eşzamanlı çalıştırır ve sonuçları tek bir sentez çağrısında birleştirir.
+    """
+
+    def __init__(self, llm, tools, max_execution_time=60, max_steps=4):
+        self.tools = tools
+        self.max_execution_time = max_execution_time
+        self.max_steps = max_steps
+        self.llm = llm
+        self.plan_chain = ChatPromptTemplate.from_template(PLAN_TEMPLATE) | llm | JsonOutputParser()
+        self.synthesis_prompt = ChatPromptTemplate.from_template(SYNTHESIS_TEMPLATE)
+        self.timed_out = 0
+
+    def is_multi_part(self, question):
+        """Birden fazla rotanın kuralı eşleşiyor ve bağlaç varsa soru çok parçalıdır"""
+        routes = {route for pattern, route in ROUTE_RULES if pattern.search(question)}
+        return len(routes) > 1 and bool(CONJUNCTION_PATTERN.search(question))
+
+    def plan(self, question):
+        """Geçerli adımları döndürür; bölünemiyorsa None"""
+        steps = self.plan_chain.invoke({"question": question, "max_steps": self.max_steps})
+        if not isinstance(steps, list):
+            return None
+        steps = [
+            step for step in steps
+            if isinstance(step, dict) and step.get("tool") in self.tools and str(step.get("input", "")).strip()
+        ][: self.max_steps]
+        return steps if len(steps) > 1 else None
+
+    def execute(self, steps, deadline):
+        """Adımları paralel çalıştırır; süre dolarsa biten sonuçlarla devam eder"""
+        started = time.perf_counter()
+        # İstek başına havuz: süresi dolup hâlâ çalışan araç çağrıları başka oturumların planlarını bekletmesin
+        executor = ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="planner")
+        # Her adım isteğin context'iyle çalışsın (izleme callback'i thread'lere taşınır)
+        futures = [
+            executor.submit(contextvars.copy_context().run, self.tools[step["tool"]], step["input"])
+            for step in steps
+        ]
+        wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        # Bitmeyen çağrılar arka planda tamamlanır; beklemeden devam et
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        observations = []
+        for step, future in zip(steps, futures):
+            if not future.done():
+                self.timed_out += 1
+                result = "The tool did not finish within the time limit."
+            elif future.exception() is not None:
+                result = f"Error: {future.exception()}"
+            else:
+                result = future.result()
+            observations.append((step, result))
+
+        logger.info("planner: %d tool calls in %.2fs", len(steps), time.perf_counter() - started)
+        return observations
+
+    def stream(self, question):
+        """
+        Soruyu planlayıp araçları çalıştırır ve sentez cevabını parça parça üretir.
+        Soru bölünemiyorsa hiçbir şey üretmeden None döndürür.
+        """
+        deadline = time.monotonic() + self.max_execution_time
+        steps = self.plan(question)
+        if steps is None:
+            return None
+        # Sürenin bir kısmı sentez için ayrılır; yavaş bir araç cevabı tamamen engellemesin
+        observations = self.execute(steps, deadline - self.max_execution_time * SYNTHESIS_SHARE)
+        return self._synthesize(question, observations, deadline)
+
+    def _synthesize(self, question, observations, deadline):
+        """Sentez de aynı süre sınırına tabi: istek zaman aşımı kalan süre, akış süre dolunca kesilir"""
+        text = "\n\n".join(
+            f"Tool: {step['tool']}\nInput: {step['input']}\nResult: {result}"
+            for step, result in observations
+        )
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("no time left for the synthesis step")
+        chain = self.synthesis_prompt | self.llm.bind(timeout=remaining) | StrOutputParser()
+        for chunk in chain.stream({"question": question, "observations": text}):
+            yield chunk
+            if time.monotonic() > deadline:
+                self.timed_out += 1
+                logger.warning("planner: synthesis stopped at the time limit")
+                yield " …"
+                return
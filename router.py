@@ -0,0 +1,151 @@
+import logging
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Her rota için örnek sorular; merkezleri (centroid) bu örneklerin embedding ortalaması
+ROUTE_EXAMPLES = {
+    "Game Search": [
+        "Recommend me an RPG game released after 2020",
+        "Suggest a relaxing farming game",
+        "Find games similar to Dark Souls",
+        "What is Hades about?",
+        "I want a story-driven game with exploration",
+        "Games about space exploration and building",
+        "Show me horror games with a good atmosphere",
+        "Which games have roguelike gameplay?",
+    ],
+    "Graph Info": [
+        "Who are the friends of 'gamer123'?",
+        "What games has 'pixelmaster' played the most?",
+        "What platforms does 'Hades' support?",
+        "Top 10 most recommended games",
+        "Which of my friends played Cyberpunk 2077?",
+        "How many hours did 'cooldragon_4617' play Elden Ring?",
+        "Which tags does Stardew Valley have?",
+        "Which users wrote reviews for Terraria?",
+    ],
+    # Selamlaşma, bot hakkında sorular ve oyun dışı konular: hızlı yol yok, agent cevaplar
+    "General Chat": [
+        "Hello, how are you?",
+        "Thanks, that was helpful",
+        "Tell me about yourself",
+        "What can you do?",
+        "Who won the world cup?",
+        "What is the weather like today?",
+        "Can you help me with my homework?",
+        "Tell me a joke",
+    ],
+}
+
+# Bu rotalara düşen sorular her zaman agent'a bırakılır
+AGENT_ROUTES = {"General Chat"}
+
+# Kural tabanlı sinyaller: (desen, rota)
+ROUTE_RULES = [
+    (re.compile(r"\b(friends?|played|playtime|hours|how many|count|users?|usernames?|reviews? (by|for|of))\b", re.I), "Graph Info"),
+    (re.compile(r"\b(top \d+|most (played|recommended|popular)|platforms?|support(s|ed)?|tags? (of|for))\b", re.I), "Graph Info"),
+    (re.compile(r"\b(recommend|suggest|similar|like .+ but|about|story|gameplay|atmosphere|genre)\b", re.I), "Game Search"),
+]
+RULE_BONUS = 0.05
+
+# Önceki konuşmaya atıf yapan sorular ("what platforms does it support?"); araç geçmişi görmediği için agent'a bırakılır
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|his|her|the same|"
+    r"(this|that|the) (game|one|user|player)|what about|how about|what else)\b",
+    re.I,
+)
+
+
+def is_follow_up(question):
+    return bool(FOLLOW_UP_PATTERN.search(question))
+
+
+class IntentRouter:
+    """
+    Net sınıflandırılabilen soruları ReAct agent'ını atlayarak doğrudan ilgili araca yönlendirir.
+    Embedding'e en yakın merkez + kurallar ile skor hesaplanır; en iyi iki rota arasındaki
+    fark eşiğin altındaysa, en yakın merkez bile yeterince benzer değilse ya da soru
+    genel sohbet / alan dışıysa soru agent'a bırakılır.
+    """
+
+    def __init__(self, embed_documents, threshold=0.08, min_similarity=0.78):
+        self.embed_documents = embed_documents
+        self.threshold = threshold
+        # En yakın merkeze benzerlik bunun altındaysa soru hiçbir rotaya yeterince yakın değildir
+        self.min_similarity = min_similarity
+        self._centroids = None
+        self._lock = threading.Lock()
+
+        self.routed = 0
+        self.fallbacks = 0
+        self.agent_latency = None
+        self.saved_seconds = 0.0
+
+    def classify(self, question):
+        """(rota veya None, güven, skorlar) döndürür"""
+        centroids = self._get_centroids()
+        vector = self._normalize(np.asarray(self.embed_documents([question])[0], dtype=np.float32))
+        scores = {route: float(centroid @ vector) for route, centroid in centroids.items()}
+        # Kural bonusu eklenmeden önceki ham benzerlik; alan dışı soruyu kurallar kurtarmasın
+        similarity = max(scores.values())
+
+        for pattern, route in ROUTE_RULES:
+            if pattern.search(question):
+                scores[route] += RULE_BONUS
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (top, top_score), (_, second_score) = ranked[0], ranked[1]
+        confidence = top_score - second_score
+        if top in AGENT_ROUTES or similarity < self.min_similarity or confidence < self.threshold:
+            return None, confidence, scores
+        return top, confidence, scores
+
+    def record_fast_path(self, route, confidence, seconds):
+        self.routed += 1
+        saved = max(self.agent_latency - seconds, 0.0) if self.agent_latency else None
+        if saved is not None:
+            self.saved_seconds += saved
+        logger.info(
+            "router: fast path -> %s (confidence=%.3f, %.2fs, est. saved=%s)",
+            route, confidence, seconds, f"{saved:.2f}s" if saved is not None else "n/a",
+        )
+
+    def record_agent(self, confidence, seconds):
+        self.fallbacks += 1
+        # Agent gecikmesinin hareketli ortalaması, tasarruf tahmini için
+        self.agent_latency = seconds if self.agent_latency is None else 0.8 * self.agent_latency + 0.2 * seconds
+        logger.info("router: agent fallback (confidence=%.3f, %.2fs)", confidence, seconds)
+
+    def stats(self):
+        total = self.routed + self.fallbacks
+        return {
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "routed_ratio": self.routed / total if total else 0.0,
+            "avg_agent_latency": self.agent_latency,
+            "estimated_saved_seconds": self.saved_seconds,
+        }
+
+    def _get_centroids(self):
+        with self._lock:
+            if self._centroids is None:
+                routes = list(ROUTE_EXAMPLES)
+                texts = [text for route in routes for text in ROUTE_EXAMPLES[route]]
+                vectors = np.asarray(self.embed_documents(texts), dtype=np.float32)
+                centroids, start = {}, 0
+                for route in routes:
+                    count = len(ROUTE_EXAMPLES[route])
+                    centroids[route] = self._normalize(vectors[start:start + count].mean(axis=0))
+                    start += count
+                self._centroids = centroids
+            return self._centroids
+
+    @staticmethod
+    def _normalize(vector):
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+
+from neo4j import Query
+
+from cypher_guard import is_write
+from db import READ, get_driver, get_database
+from tracing import trace_log_path
+
+# Üretilen sorguların filtrelediği özellikler için kısıtlar ve index'ler.
+# Hepsi IF NOT EXISTS ile; komut istenildiği kadar tekrar çalıştırılabilir.
+# Uniqueness kısıtı kendi range index'ini oluşturduğu için aynı özelliğe ayrıca index açılmaz.
+SCHEMA_ITEMS = [
+    ("constraint", "game_app_id", "CREATE CONSTRAINT game_app_id IF NOT EXISTS FOR (g:Game) REQUIRE g.app_id IS UNIQUE"),
+    ("constraint", "user_user_id", "CREATE CONSTRAINT user_user_id IF NOT EXISTS FOR (u:User) REQUIRE u.user_id IS UNIQUE"),
+    ("constraint", "review_review_id", "CREATE CONSTRAINT review_review_id IF NOT EXISTS FOR (r:Review) REQUIRE r.review_id IS UNIQUE"),
+    ("constraint", "tag_name", "CREATE CONSTRAINT tag_name IF NOT EXISTS FOR (t:Tag) REQUIRE t.name IS UNIQUE"),
+    ("constraint", "platform_name", "CREATE CONSTRAINT platform_name IF NOT EXISTS FOR (p:Platform) REQUIRE p.name IS UNIQUE"),
+    ("constraint", "session_id", "CREATE CONSTRAINT session_id IF NOT EXISTS FOR (s:Session) REQUIRE s.id IS UNIQUE"),
+    ("constraint", "data_version_label", "CREATE CONSTRAINT data_version_label IF NOT EXISTS FOR (v:DataVersion) REQUIRE v.label IS UNIQUE"),
+    ("range", "game_title", "CREATE INDEX game_title IF NOT EXISTS FOR (g:Game) ON (g.title)"),
+    ("range", "game_recommendation_count", "CREATE INDEX game_recommendation_count IF NOT EXISTS FOR (g:Game) ON (g.recommendation_count)"),
+    ("range", "user_username", "CREATE INDEX user_username IF NOT EXISTS FOR (u:User) ON (u.username)"),
+    ("range", "review_is_recommended", "CREATE INDEX review_is_recommended IF NOT EXISTS FOR (r:Review) ON (r.is_recommended)"),
+    ("relationship", "played_last_played_date", "CREATE INDEX played_last_played_date IF NOT EXISTS FOR ()-[p:PLAYED]-() ON (p.last_played_date)"),
+    ("relationship", "played_total_playtime", "CREATE INDEX played_total_playtime IF NOT EXISTS FOR ()-[p:PLAYED]-() ON (p.total_playtime)"),
+    # CONTAINS / ENDS WITH aramaları için
+    ("text", "game_title_text", "CREATE TEXT INDEX game_title_text IF NOT EXISTS FOR (g:Game) ON (g.title)"),
+    ("text", "user_username_text", "CREATE TEXT INDEX user_username_text IF NOT EXISTS FOR (u:User) ON (u.username)"),
+]
+
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan", "DirectedAllRelationshipsScan",
+                  "UndirectedAllRelationshipsScan", "DirectedRelationshipTypeScan",
+                  "UndirectedRelationshipTypeScan")
+SCAN_DETAILS = re.compile(r"(\w+):`?(\w+)`?")
+PREDICATE_PATTERN = re.compile(r"(\w+)\.`?(\w+)`?\s*(?:=|<>|<=|>=|<|>|IN\b|STARTS WITH|ENDS WITH|CONTAINS)", re.I)
+
+
+def existing_schema(driver, database):
+    names = set()
+    for query in ("SHOW INDEXES YIELD name", "SHOW CONSTRAINTS YIELD name"):
+        records, _, _ = driver.execute_query(query, database_=database, routing_=READ)
+        names.update(r["name"] for r in records)
+    return names
+
+
+def bootstrap(kinds=None, dry_run=False, wait_seconds=300):
+    """Eksik kısıt/index'leri oluştur; {ad: "created" | "exists" | "planned"} döndürür"""
+    driver, database = get_driver(), get_database()
+    existing = existing_schema(driver, database)
+    report = {}
+    for kind, name, statement in SCHEMA_ITEMS:
+        if kinds and kind not in kinds:
+            continue
+        if name in existing:
+            report[name] = "exists"
+            continue
+        if dry_run:
+            report[name] = "planned"
+            print(statement)
+            continue
+        driver.execute_query(statement, database_=database)
+        report[name] = "created"
+
+    # Yeni index'ler arka planda dolar; sorgular hazır olunca kullanabilsin diye bekle
+    if wait_seconds and "created" in report.values():
+        driver.execute_query("CALL db.awaitIndexes($seconds)", {"seconds": wait_seconds}, database_=database)
+    return report
+
+
+def recent_queries(path, limit=500):
+    """İz log'undaki son `limit` izden (sorgu, parametreler, çalışma sayısı)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+
+    counts, params = Counter(), {}
+    for line in lines:
+        try:
+            trace = json.loads(line)
+        except ValueError:
+            continue
+        for span in trace.get("spans", []):
+            query = span.get("query")
+            if span.get("kind") != "cypher" or not query:
+                continue
+            counts[query] += 1
+            if span.get("params") is not None:
+                params.setdefault(query, span["params"])
+    return [(query, params.get(query), count) for query, count in counts.most_common()]
+
+
+def _walk(plan):
+    stack = [plan] if plan else []
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get("children", []))
+
+
+def suggest_indexes(plan):
+    """Etiket taramasından sonra filtrelenen özellikler için önerilen index'ler"""
+    variables, filtered = {}, set()
+    for node in _walk(plan):
+        operator = node.get("operatorType", "").split("@")[0]
+        details = str(node.get("args", {}).get("Details", ""))
+        if operator.startswith("NodeByLabelScan"):
+            variables.update(SCAN_DETAILS.findall(details))
+        elif operator.startswith("Filter"):
+            filtered.update(PREDICATE_PATTERN.findall(details))
+    return sorted(
+        f"CREATE INDEX IF NOT EXISTS FOR (n:{variables[var]}) ON (n.{prop})"
+        for var, prop in filtered if var in variables
+    )
+
+
+def profile(driver, database, query, params, timeout=30.0):
+    """PROFILE ile çalıştır: toplam db hit, satır sayısı, tarama operatörleri ve öneriler"""
+    with driver.session(database=database, default_access_mode="READ") as session:
+        summary = session.run(Query("PROFILE " + query, timeout=timeout), params or {}).consume()
+    plan = summary.profile or {}
+    nodes = list(_walk(plan))
+    return {
+        "db_hits": sum(node.get("dbHits", 0) for node in nodes),
+        "rows": plan.get("rows", 0),
+        "scans": sorted({
+            node.get("operatorType", "").split("@")[0]
+            for node in nodes if node.get("operatorType", "").startswith(SCAN_OPERATORS)
+        }),
+        "suggestions": suggest_indexes(plan),
+    }
+
+
+def advise(trace_path, limit=500, max_db_hits=10_000):
+    """Son çalışan Cypher sorgularını PROFILE edip tarama yapan ya da pahalı olanları raporla"""
+    driver, database = get_driver(), get_database()
+    findings, skipped = [], 0
+    for query, params, count in recent_queries(trace_path, limit):
+        # Yazan sorgular PROFILE ile tekrar çalıştırılmaz; parametresi kaydedilmemişse çalıştırılamaz
+        if "$" in query and params is None:
+            skipped += 1
+            continue
+        try:
+            if is_write(driver, query, database):
+                skipped += 1
+                continue
+            result = profile(driver, database, query, params)
+        except Exception as e:
+            findings.append({"query": query, "count": count, "error": str(e)})
+            continue
+        if result["scans"] or result["db_hits"] > max_db_hits:
+            findings.append({"query": query, "count": count, **result})
+
+    # Önce en sık çalışan ve en pahalı sorgular
+    findings.sort(key=lambda f: (f["count"] * f.get("db_hits", 0)), reverse=True)
+    return findings, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index/kısıtları oluştur ve iz log'undaki sorguları incele")
+    parser.add_argument("--dry-run", action="store_true", help="Sadece eksik ifadeleri yazdır")
+    parser.add_argument("--kind", nargs="*", choices=sorted({kind for kind, _, _ in SCHEMA_ITEMS}))
+    parser.add_argument("--advise", action="store_true", help="İz log'undaki son sorguları PROFILE et")
+    parser.add_argument("--traces", help="İz log'u (varsayılan: TRACE_LOG_PATH)")
+    parser.add_argument("--limit", type=int, default=500, help="İncelenecek son iz sayısı")
+    parser.add_argument("--max-db-hits", type=int, default=10_000)
+    args = parser.parse_args()
+
+    started = time.time()
+    report = bootstrap(args.kind, args.dry_run)
+    for status in ("created", "planned", "exists"):
+        names = [name for name, s in report.items() if s == status]
+        if names:
+            print(f"{status}: {', '.join(names)}")
+    print(f"schema bootstrap finished in {time.time() - started:.1f}s")
+
+    if args.advise:
+        findings, skipped = advise(args.traces or trace_log_path(), args.limit, args.max_db_hits)
+        print(f"\n{len(findings)} queries need attention ({skipped} skipped: writes or missing parameters)")
+        for finding in findings:
+            print("\n" + finding["query"].strip())
+            if "error" in finding:
+                print(f"  PROFILE failed: {finding['error']}")
+                continue
+            print(f"  runs: {finding['count']}, db hits: {finding['db_hits']:,}, rows: {finding['rows']:,}")
+            if finding["scans"]:
+                print(f"  scans: {', '.join(finding['scans'])}")
+            for suggestion in finding["suggestions"]:
+                print(f"  suggestion: {suggestion}")
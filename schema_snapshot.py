@@ -0,0 +1,134 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from langchain_neo4j.chains.graph_qa.cypher import construct_schema
+
+logger = logging.getLogger(__name__)
+
+# Snapshot dosya biçimi değişirse artırılır
+SNAPSHOT_VERSION = 1
+
+# Prompt'a hiç girmemesi gereken özellikler
+HIDDEN_PROPERTIES = {"embedding", "text_hash", "embedded_at"}
+
+# Sorudaki kelime -> ilgili etiket / ilişki tipleri
+SCHEMA_HINTS = {
+    "friend": ["User", "FRIENDS_WITH"],
+    "play": ["User", "Game", "PLAYED"],
+    "player": ["User", "Game", "PLAYED"],
+    "hour": ["User", "Game", "PLAYED"],
+    "tag": ["Game", "Tag", "HAS_TAG"],
+    "genre": ["Game", "Tag", "HAS_TAG"],
+    "platform": ["Game", "Platform", "SUPPORTS"],
+    "support": ["Game", "Platform", "SUPPORTS"],
+    "review": ["User", "Review", "Game", "WROTE_REVIEW", "REVIEWS"],
+    "recommend": ["Review", "Game", "REVIEWS"],
+    "description": ["Game", "Description", "HAS_DESCRIPTION"],
+    "about": ["Game", "Description", "HAS_DESCRIPTION"],
+}
+
+STOP_WORDS = {"has", "with", "of", "the"}
+
+
+def schema_fingerprint(graph):
+    """Etiket, ilişki tipi ve özellik anahtarlarından ucuz bir parmak izi"""
+    result = graph.query("""
+        CALL db.labels() YIELD label WITH collect(label) AS labels
+        CALL db.relationshipTypes() YIELD relationshipType WITH labels, collect(relationshipType) AS types
+        CALL db.propertyKeys() YIELD propertyKey
+        RETURN labels, types, collect(propertyKey) AS keys
+    """)
+    row = result[0] if result else {"labels": [], "types": [], "keys": []}
+    payload = json.dumps([sorted(row["labels"]), sorted(row["types"]), sorted(row["keys"])])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_schema(graph, path):
+    """
+    Şema diskteki snapshot'tan yüklenir; parmak izi değiştiyse (ya da snapshot yoksa)
+    graph.refresh_schema() ile yeniden okunup kaydedilir. graph, refresh_schema=False
+    ile oluşturulmuş olmalı.
+    """
+    started = time.perf_counter()
+    fingerprint = schema_fingerprint(graph)
+
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") == SNAPSHOT_VERSION and snapshot.get("fingerprint") == fingerprint:
+                graph.structured_schema = snapshot["structured_schema"]
+                graph.schema = snapshot["schema"]
+                logger.info("schema loaded from snapshot in %.3fs", time.perf_counter() - started)
+                return False
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("schema snapshot unreadable, refreshing: %s", e)
+
+    graph.refresh_schema()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": fingerprint,
+            "created_at": time.time(),
+            "structured_schema": graph.structured_schema,
+            "schema": graph.schema,
+        }, f, default=str)
+    os.replace(tmp_path, path)
+    logger.info("schema introspected and saved in %.3fs", time.perf_counter() - started)
+    return True
+
+
+def _words(name):
+    """'FRIENDS_WITH' -> ['friends'], 'Game' -> ['game']"""
+    parts = re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+", name)
+    return [p.lower() for p in parts if p.lower() not in STOP_WORDS]
+
+
+def _mentions(word, tokens):
+    # Kaba kök eşleşmesi: 'played' ~ 'play', 'games' ~ 'game'
+    stem = word[:max(4, len(word) - 2)]
+    return any(token.startswith(stem) or word.startswith(token[:max(4, len(token) - 2)]) for token in tokens if len(token) > 2)
+
+
+def relevant_types(structured_schema, question):
+    """Soruyla ilgili etiket ve ilişki tipleri; hiçbiri bulunamazsa boş küme"""
+    tokens = re.findall(r"[a-z0-9]+", question.lower())
+    labels = set(structured_schema.get("node_props", {}))
+    rel_types = {r["type"] for r in structured_schema.get("relationships", [])}
+
+    selected = set()
+    for name in labels | rel_types:
+        if any(_mentions(word, tokens) for word in _words(name)):
+            selected.add(name)
+    for hint, names in SCHEMA_HINTS.items():
+        if any(token.startswith(hint) for token in tokens):
+            selected.update(name for name in names if name in labels | rel_types)
+
+    # Seçilen ilişkilerin uç düğümleri de şemada olmalı
+    for rel in structured_schema.get("relationships", []):
+        if rel["type"] in selected:
+            selected.update([rel["start"], rel["end"]])
+    return selected
+
+
+def render_schema(structured_schema, question=None):
+    """Sadece soruyla ilgili etiket/ilişkileri içeren kısa şema metni"""
+    schema = copy.deepcopy(structured_schema)
+    for props in list(schema.get("node_props", {}).values()) + list(schema.get("rel_props", {}).values()):
+        props[:] = [p for p in props if p["property"] not in HIDDEN_PROPERTIES]
+
+    include = relevant_types(schema, question) if question else set()
+    if include:
+        # Etiket seçildiyse aralarındaki ilişkiler de gelsin
+        include.update(
+            r["type"] for r in schema.get("relationships", [])
+            if r["start"] in include and r["end"] in include
+        )
+    return construct_schema(schema, sorted(include), [])
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bileşen adı -> {"seconds", "status", "error", "at"}; soğuk başlangıç profili
+_profile = OrderedDict()
+_profile_lock = threading.Lock()
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def record(name, seconds, status="ok", error=None, replace=True):
+    with _profile_lock:
+        if not replace and name in _profile:
+            return
+        _profile[name] = {"seconds": seconds, "status": status, "error": error, "at": time.time()}
+    logger.info("startup: %s %s in %.3fs", name, status, seconds)
+
+
+def startup_profile():
+    """Kaydedilen başlatma süreleri, kayıt sırasıyla"""
+    with _profile_lock:
+        return [{"name": name, **entry} for name, entry in _profile.items()]
+
+
+class LazyResource:
+    """
+    İlk kullanımda bir kez oluşturulan, process içindeki tüm Streamlit
+    oturumlarının paylaştığı singleton. Oluşturma hata verirse hata
+    retry_after saniye boyunca yeniden denenmeden tekrar fırlatılır.
+    """
+
+    def __init__(self, name, factory, retry_after=30.0):
+        self.name = name
+        self.factory = factory
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._ready = False
+        self._value = None
+        self._error = None
+        self._failed_at = 0.0
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def __call__(self):
+        return self.get()
+
+    def set(self, value):
+        """Hazır bir nesne yerleştir (benchmark'ta sahte LLM/embedding için)"""
+        with self._lock:
+            self._value, self._error, self._ready = value, None, True
+
+    def get(self):
+        if self._ready:
+            return self._value
+        with self._lock:
+            if self._ready:
+                return self._value
+            if self._error is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise self._error
+
+            started = time.perf_counter()
+            try:
+                value = self.factory()
+            except Exception as e:
+                self._error, self._failed_at = e, time.monotonic()
+                record(self.name, time.perf_counter() - started, "failed", str(e))
+                raise
+            record(self.name, time.perf_counter() - started)
+            self._value, self._error, self._ready = value, None, True
+            return value
+
+
+def lazy(name, retry_after=30.0):
+    """Fonksiyonu LazyResource'a çeviren dekoratör"""
+    def decorator(factory):
+        return LazyResource(name, factory, retry_after)
+    return decorator
+
+
+def warm_up(*resources):
+    """Kaynakları arka planda sırayla oluştur; process başına bir kez çalışır"""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+
+        def run():
+            started = time.perf_counter()
+            for resource in resources:
+                try:
+                    resource.get()
+                except Exception as e:
+                    logger.warning("warm-up of %s failed: %s", resource.name, e)
+            record("warm-up total", time.perf_counter() - started)
+
+        _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        _warm_up_thread.start()
+        return _warm_up_thread
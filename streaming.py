@@ -0,0 +1,44 @@
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class AgentStreamHandler(BaseCallbackHandler):
+    """
+    Agent çalışırken olayları bir kuyruğa yazan callback.
+    Sadece "Final Answer:" sonrasındaki token'lar ("token", metin) olarak,
+    araç çağrıları ise ("tool", araç adı) olarak iletilir.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self._buffers = {}
+        self._streaming_runs = set()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._buffers[run_id] = ""
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._buffers[run_id] = ""
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._streaming_runs:
+            self.events.put(("token", token))
+            return
+
+        # Marker birden fazla token'a bölünebilir; bulunana kadar biriktir
+        buffer = self._buffers.get(run_id, "") + token
+        self._buffers[run_id] = buffer
+        index = buffer.find(FINAL_ANSWER_MARKER)
+        if index >= 0:
+            self._streaming_runs.add(run_id)
+            rest = buffer[index + len(FINAL_ANSWER_MARKER):].lstrip()
+            if rest:
+                self.events.put(("token", rest))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._buffers.pop(run_id, None)
+        self._streaming_runs.discard(run_id)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.events.put(("tool", serialized.get("name", "tool")))
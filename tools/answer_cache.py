@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Benzer sorular için önceki cevabı döndüren embedding tabanlı LRU/TTL cache"""
+
+    def __init__(
+        self,
+        embed_fn,
+        threshold=0.95,
+        max_entries=1000,
+        max_bytes=64 * 1024 * 1024,
+        ttl=3600,
+        fingerprint_fn=None,
+        fingerprint_interval=30,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Index içeriği değişince cache'i boşaltmak için parmak izi fonksiyonu
+        self.fingerprint_fn = fingerprint_fn
+        self.fingerprint_interval = fingerprint_interval
+
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._bytes = 0
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        self._fingerprint = None
+        self._fingerprint_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def embed(self, question):
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question):
+        """(cevap veya None, normalize embedding) döndürür"""
+        self._check_fingerprint()
+        vector = self.embed(question)
+
+        with self._lock:
+            self._expire()
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = list(self._entries.keys())
+                    self._matrix = np.vstack([self._entries[k]["vector"] for k in self._matrix_keys])
+                scores = self._matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = self._matrix_keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]["answer"], vector
+            self.misses += 1
+            return None, vector
+
+    def store(self, question, vector, answer):
+        size = vector.nbytes + len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = {
+                "question": question,
+                "vector": vector,
+                "answer": answer,
+                "size": size,
+                "created_at": time.monotonic(),
+            }
+            self._bytes += size
+            self._matrix = None
+
+            # Kapasite aşılırsa en eski kullanılanları çıkar
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop_oldest()
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._bytes = 0
+        self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _pop_oldest(self):
+        _, entry = self._entries.popitem(last=False)
+        self._bytes -= entry["size"]
+        self._matrix = None
+        self.evictions += 1
+
+    def _expire(self):
+        if not self.ttl:
+            return
+        deadline = time.monotonic() - self.ttl
+        # Süresi dolan kayıtları çıkar
+        expired = [k for k, e in self._entries.items() if e["created_at"] < deadline]
+        for key in expired:
+            self._bytes -= self._entries.pop(key)["size"]
+            self.evictions += 1
+        if expired:
+            self._matrix = None
+
+    def _check_fingerprint(self):
+        if self.fingerprint_fn is None:
+            return
+        # Kontrol sırası kilit altında alınır; parmak izi (Neo4j çağrısı) kilit dışında hesaplanır
+        with self._lock:
+            now = time.monotonic()
+            if now - self._fingerprint_checked_at < self.fingerprint_interval:
+                return
+            self._fingerprint_checked_at = claimed_at = now
+        try:
+            fingerprint = self.fingerprint_fn()
+        except Exception:
+            return
+        with self._lock:
+            # Bu arada daha yeni bir kontrol başladıysa eski sonuç onunkini ezmesin
+            if self._fingerprint_checked_at != claimed_at:
+                return
+            if self._fingerprint is not None and fingerprint != self._fingerprint:
+                self._clear()
+            self._fingerprint = fingerprint
@@ -13,11 +13,22 @@ sys.path.append(project_root)
 
 # Şimdi llm modülünü doğrudan içe aktarabilirsiniz
 
+import logging
 import streamlit as st
 from llm import llm
 from graph import graph
-from langchain_neo4j import GraphCypherQAChain
+from langchain_neo4j.chains.graph_qa.cypher_utils import CypherQueryCorrector, Schema
 from langchain.prompts.prompt import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from tools.cypher_templates import CypherTemplateCache
+from tools.result_cache import CachedGraph, CypherResultCache
+from tools.result_format import compact_results
+from tools.cypher_params import CypherValidationError, inline_literals, parse_generation, validate_generation
+from data_version import get_data_versions
+from schema_snapshot import render_schema
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 # --- DÜZELTİLMİŞ TEMPLATE ---
 # Değişken olmayan tüm süslü parantezler çiftlenerek {{ ve }} haline getirildi.
@@ -25,9 +36,10 @@ CYPHER_GENERATION_TEMPLATE = """
 Task: Generate Cypher query based on user's question.
 Instructions:
 - Use ONLY the provided schema
-- Output ONLY the executable Cypher query
+- Output ONLY a JSON object with two keys: "cypher" (the executable Cypher query) and "params" (an object)
+- Never put names, titles, tags, platforms, dates or numbers from the question directly into the query.
+  Reference them as $parameters and put their values in "params"
 - Never include explanations, markdown, or natural language
-- Start directly with Cypher keywords (MATCH, RETURN, etc.)
 You are an expert Neo4j Developer translating user questions into Cypher to answer questions about video games and generate personalized recommendations.
 Convert the user's question based on the provided schema.
 
@@ -45,79 +57,56 @@ Schema includes information about:
 - Review statistics: (User)-[:WROTE_REVIEW]->(Review)-[:REVIEWS]->(Game)
 
 Do not return the full Description text unless the user specifically asks for it.
+Users are matched by username; if the question gives a numeric user id instead, match on u.user_id (an integer).
+Game.recommendation_count comes from the source data and may be missing; Game.summary_recommended_count is the number of positive reviews in the graph.
 
 Fine-Tuning:
 - If a game title starts with "The", move "The" to the end for sorting or matching purposes. 
   For example, "The Witcher 3" becomes "Witcher 3, The".
 
-Example Cypher Statements:
+Example outputs:
 
 1. To find who played a game:
-MATCH (u:User)-[p:PLAYED]->(g:Game {{title: "Stardew Valley"}})
-RETURN u.username, p.total_playtime, p.days_per_week
+{{"cypher": "MATCH (u:User)-[p:PLAYED]->(g:Game {{title: $title}}) RETURN u.username, p.total_playtime, p.days_per_week", "params": {{"title": "Stardew Valley"}}}}
 
 2. To find games with a specific tag:
-MATCH (g:Game)-[:HAS_TAG]->(t:Tag {{name: "RPG"}})
-RETURN g.title, g.app_id
+{{"cypher": "MATCH (g:Game)-[:HAS_TAG]->(t:Tag {{name: $tag}}) RETURN g.title, g.app_id", "params": {{"tag": "RPG"}}}}
 
 3. To get games a user's friends have played:
-MATCH (u:User {{username: "gamer123"}})-[:FRIENDS_WITH]-(f:User)-[:PLAYED]->(g:Game)
-RETURN g.title, count(*) AS times_played
-ORDER BY times_played DESC
+{{"cypher": "MATCH (u:User {{username: $username}})-[:FRIENDS_WITH]-(f:User)-[:PLAYED]->(g:Game) RETURN g.title, count(*) AS times_played ORDER BY times_played DESC", "params": {{"username": "gamer123"}}}}
 
 4. Get all games supported on a specific platform:
-MATCH (g:Game)-[:SUPPORTS]->(p:Platform {{name: "Windows"}})
-RETURN g.title, g.app_id, g.price
+{{"cypher": "MATCH (g:Game)-[:SUPPORTS]->(p:Platform {{name: $platform}}) RETURN g.title, g.app_id, g.price", "params": {{"platform": "Windows"}}}}
 
 5. Retrieve top games played by a specific user (by total playtime):
-MATCH (u:User {{username: "pixelninja"}})-[p:PLAYED]->(g:Game)
-RETURN g.title, p.total_playtime
-ORDER BY p.total_playtime DESC
-LIMIT 5
+{{"cypher": "MATCH (u:User {{username: $username}})-[p:PLAYED]->(g:Game) RETURN g.title, p.total_playtime ORDER BY p.total_playtime DESC LIMIT $limit", "params": {{"username": "pixelninja", "limit": 5}}}}
 
 6. Find games that are both RPG and Multiplayer:
-MATCH (g:Game)-[:HAS_TAG]->(t1:Tag {{name: "RPG"}})
-MATCH (g)-[:HAS_TAG]->(t2:Tag {{name: "Multiplayer"}})
-RETURN g.title, g.app_id
+{{"cypher": "MATCH (g:Game)-[:HAS_TAG]->(t1:Tag {{name: $tag1}}) MATCH (g)-[:HAS_TAG]->(t2:Tag {{name: $tag2}}) RETURN g.title, g.app_id", "params": {{"tag1": "RPG", "tag2": "Multiplayer"}}}}
 
 7. Get games released after 2020:
-MATCH (g:Game)
-WHERE date(g.release_date) > date("2020-01-01")
-RETURN g.title, g.release_date
+{{"cypher": "MATCH (g:Game) WHERE date(g.release_date) > date($after) RETURN g.title, g.release_date", "params": {{"after": "2020-01-01"}}}}
 
 8. Find which of my friends played a specific game:
-MATCH (me:User {{username: "gamer123"}})-[:FRIENDS_WITH]->(f:User)-[:PLAYED]->(g:Game {{title: "Cyberpunk 2077"}})
-RETURN f.username, g.name
+{{"cypher": "MATCH (me:User {{username: $username}})-[:FRIENDS_WITH]->(f:User)-[:PLAYED]->(g:Game {{title: $title}}) RETURN f.username, g.title", "params": {{"username": "gamer123", "title": "Cyberpunk 2077"}}}}
 
 9. Get top 10 most recommended games (based on recommendation_count):
-MATCH (g:Game)
-RETURN g.title, g.recommendation_count
-ORDER BY g.recommendation_count DESC
-LIMIT 10
+{{"cypher": "MATCH (g:Game) WITH g, coalesce(g.recommendation_count, g.summary_recommended_count) AS recommendation_count RETURN g.title, recommendation_count ORDER BY recommendation_count DESC LIMIT $limit", "params": {{"limit": 10}}}}
 
 10. Find games that users have recommended via reviews:
-MATCH (u:User)-[:WROTE_REVIEW]->(r:Review {{is_recommended: true}})-[:REVIEWS]->(g:Game)
-RETURN g.title, count(*) AS recommendation_count
-ORDER BY recommendation_count DESC
+{{"cypher": "MATCH (u:User)-[:WROTE_REVIEW]->(r:Review {{is_recommended: true}})-[:REVIEWS]->(g:Game) RETURN g.title, count(*) AS recommendation_count ORDER BY recommendation_count DESC", "params": {{}}}}
 
 11. List games played in the last 30 days:
-MATCH (u:User)-[p:PLAYED]->(g:Game)
-WHERE p.last_played_date >= date() - duration({{days: 30}})
-RETURN DISTINCT g.title, p.last_played_date
+{{"cypher": "MATCH (u:User)-[p:PLAYED]->(g:Game) WHERE p.last_played_date >= date() - duration({{days: $days}}) RETURN DISTINCT g.title, p.last_played_date", "params": {{"days": 30}}}}
 
 12. Average number of days per week a specific game is played:
-MATCH (u:User)-[p:PLAYED]->(g:Game {{title: "Elden Ring"}})
-RETURN avg(p.days_per_week) AS avg_days_per_week
+{{"cypher": "MATCH (u:User)-[p:PLAYED]->(g:Game {{title: $title}}) RETURN avg(p.days_per_week) AS avg_days_per_week", "params": {{"title": "Elden Ring"}}}}
 
 13. Tags and platforms for a specific game:
-MATCH (g:Game {{name: "Hades"}})
-OPTIONAL MATCH (g)-[:HAS_TAG]->(t:Tag)
-OPTIONAL MATCH (g)-[:SUPPORTS]->(p:Platform)
-RETURN g.title, collect(DISTINCT t.name) AS tags, collect(DISTINCT p.name) AS platforms
+{{"cypher": "MATCH (g:Game {{title: $title}}) OPTIONAL MATCH (g)-[:HAS_TAG]->(t:Tag) OPTIONAL MATCH (g)-[:SUPPORTS]->(p:Platform) RETURN g.title, collect(DISTINCT t.name) AS tags, collect(DISTINCT p.name) AS platforms", "params": {{"title": "Hades"}}}}
 
 14. Find friends for a specific user:
-MATCH (u:User {{username: "cooldragon_4617"}}) - [:FRIENDS_WITH] - (f:User)
-RETURN f.username
+{{"cypher": "MATCH (u:User {{username: $username}})-[:FRIENDS_WITH]-(f:User) RETURN f.username", "params": {{"username": "cooldragon_4617"}}}}
 
 Schema:
 {schema}
@@ -129,6 +118,8 @@ Question:
 QA_GENERATION_TEMPLATE = """You are a helpful assistant that interprets Neo4j database query results.
 
 The context below contains the actual results from a database query. 
+It is a table: the first line says how many rows there are, the second line
+has the column names and every following line is one row, with values separated by " | ".
 Your job is to present this information in a clear, user-friendly format.
 
 IMPORTANT: 
@@ -150,7 +141,19 @@ Rules:
 Your response:"""
 
 
-cypher_prompt = PromptTemplate(
+# Cypher prompt'una sadece soruyla ilgili etiket/ilişkiler eklensin
+COMPACT_SCHEMA = bool(st.secrets.get("CYPHER_COMPACT_SCHEMA", True))
+
+
+class CompactSchemaPrompt(PromptTemplate):
+    """Zincirin verdiği tam şema yerine sadece soruyla ilgili kısmı prompt'a koyar"""
+
+    def format(self, **kwargs):
+        if COMPACT_SCHEMA and graph.structured_schema:
+            kwargs["schema"] = render_schema(graph.structured_schema, kwargs.get("question"))
+        return super().format(**kwargs)
+
+cypher_prompt = CompactSchemaPrompt(
     input_variables=["schema", "question"],
     template=CYPHER_GENERATION_TEMPLATE
 )
@@ -160,15 +163,84 @@ qa_prompt = PromptTemplate(
     template=QA_GENERATION_TEMPLATE
 )
 
-cypher_qa = GraphCypherQAChain.from_llm(
-    llm,
-    graph=graph,
-    cypher_prompt=cypher_prompt,
-    qa_prompt=qa_prompt,  # QA prompt eklendi
-    verbose=True,
-    validate_cypher=True,
-    allow_dangerous_requests=True,
-    return_intermediate_steps=False,  # Bu da önemli
-    top_k=100,  # Daha fazla sonuç döndürmesi için
-    return_direct=False  # Bu önemli - LLM'in sonucu işlemesi için
+# Üretilen Cypher'ın sonuçları; ingestion/yazma yolları :DataVersion sayaçlarını artırınca geçersizleşir
+result_cache = CypherResultCache(
+    lambda: get_data_versions().current(),
+    max_bytes=int(st.secrets.get("CYPHER_RESULT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    max_entries=int(st.secrets.get("CYPHER_RESULT_CACHE_MAX_ENTRIES", 5000)),
+    ttl=int(st.secrets.get("CYPHER_RESULT_CACHE_TTL", 3600)),
+)
+cached_graph = CachedGraph(graph, result_cache) if st.secrets.get("CYPHER_RESULT_CACHE", True) else graph
+
+# Daha fazla sonuç döndürmesi için
+TOP_K = 100
+# QA prompt'una giren sonuç tablosunun token bütçesi
+QA_CONTEXT_TOKEN_BUDGET = int(st.secrets.get("CYPHER_QA_TOKEN_BUDGET", 1500))
+
+cypher_generation_chain = cypher_prompt | llm | StrOutputParser()
+qa_chain = qa_prompt | llm | StrOutputParser()
+
+# İlişki yönlerini şemaya göre düzelten / şemada olmayan ilişkiyi reddeden kontrol
+relationships = graph.structured_schema.get("relationships", [])
+query_corrector = CypherQueryCorrector(
+    [Schema(r["start"], r["type"], r["end"]) for r in relationships]
+) if relationships else None
+
+# Soru kalıbı -> parametreli Cypher cache'i
+template_cache = CypherTemplateCache(
+    st.secrets.get("CYPHER_TEMPLATE_PATH", os.path.join(project_root, ".cache", "cypher_templates.json")),
+    threshold=float(st.secrets.get("CYPHER_TEMPLATE_THRESHOLD", 0.9)),
 )
+
+
+def generate_cypher(question):
+    """
+    LLM'den parametreli sorgu ve parametre sözlüğü al, çalıştırmadan önce doğrula.
+    Literal'ler parametre olduğu için aynı kalıptaki sorular aynı sorgu metnini
+    üretir; Neo4j'nin plan cache'i ve sonuç cache'i bunları yeniden kullanır.
+    """
+    cypher, params = parse_generation(
+        cypher_generation_chain.invoke({"question": question, "schema": graph.schema})
+    )
+    if query_corrector is not None and cypher:
+        cypher = query_corrector(cypher)
+        if not cypher:
+            raise CypherValidationError("generated query uses relationships that are not in the schema")
+    params = validate_generation(cypher, params)
+
+    literals = inline_literals(cypher)
+    if literals:
+        logger.info("generated Cypher has %d inline literals: %s", literals, cypher)
+    logger.debug("generated Cypher: %s %s", cypher, params)
+    return cypher, params
+
+
+def qa_context(rows):
+    """Sonuçları bütçeli tabloya çevir; ham hâline göre token kazancını logla ve ize yaz"""
+    with span("context", "cypher results", rows=len(rows)) as attrs:
+        context = compact_results(rows, llm.get_num_tokens, QA_CONTEXT_TOKEN_BUDGET)
+        attrs["tokens_before"] = llm.get_num_tokens(str(rows))
+        attrs["tokens_after"] = llm.get_num_tokens(context)
+    logger.info("QA context: %d rows, %d -> %d tokens",
+                len(rows), attrs["tokens_before"], attrs["tokens_after"])
+    return context
+
+
+def answer_graph_question(question):
+    """Bilinen bir soru kalıbıysa Cypher üretimini atla, değilse LLM ile parametreli sorgu üret"""
+    match = template_cache.match(question)
+    if match:
+        cypher, params, _ = match
+        context = cached_graph.query(cypher, params)[:TOP_K]
+        if context:
+            answer = qa_chain.invoke({"question": question, "context": qa_context(context)})
+            return {"query": question, "result": answer}
+        # Kalıp boş sonuç verdiyse LLM ile tekrar dene
+        template_cache.record_fallback()
+
+    cypher, params = generate_cypher(question)
+    context = cached_graph.query(cypher, params)[:TOP_K]
+    if context:
+        template_cache.learn(question, cypher, context, params)
+    answer = qa_chain.invoke({"question": question, "context": qa_context(context)})
+    return {"query": question, "cypher": cypher, "params": params, "result": answer}
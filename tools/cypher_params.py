@@ -0,0 +1,70 @@
+import json
+import re
+
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+
+from tools.cypher_templates import WRITE_CLAUSES
+
+PARAMETER_PATTERN = re.compile(r"\$`?([A-Za-z_][A-Za-z0-9_]*)`?")
+STRING_LITERAL = re.compile(r"\"(?:[^\"\\\\]|\\\\.)*\"|'(?:[^'\\\\]|\\\\.)*'")
+SCALAR_TYPES = (str, int, float, bool, type(None))
+MAX_PARAMETER_LENGTH = 200
+
+
+class CypherValidationError(ValueError):
+    """Üretilen sorgu çalıştırılmadan reddedildi"""
+
+
+def parse_generation(text):
+    """
+    LLM çıktısından (cypher, params) çıkarır. Beklenen biçim
+    {"cypher": "...", "params": {...}}; düz Cypher dönerse params boş kalır.
+    """
+    text = text.strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start >= 0 and end > start:
+        try:
+            # strict=False: model sorgu içine gerçek satır sonu koyabiliyor
+            data = json.loads(text[start:end + 1], strict=False)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("cypher"), str):
+            params = data.get("params") or {}
+            if not isinstance(params, dict):
+                raise CypherValidationError("params must be a JSON object")
+            return data["cypher"].strip(), params
+    return extract_cypher(text).strip(), {}
+
+
+def _valid_value(value):
+    if isinstance(value, list):
+        return all(isinstance(v, SCALAR_TYPES) for v in value)
+    if isinstance(value, str):
+        return len(value) <= MAX_PARAMETER_LENGTH
+    return isinstance(value, SCALAR_TYPES)
+
+
+def validate_generation(cypher, params):
+    """
+    Çalıştırmadan önce kontrol: salt-okunur olmalı, kullanılan her $parametre
+    verilmiş olmalı ve değerler basit tipler olmalı. Kullanılmayan parametreler atılır.
+    """
+    if not cypher:
+        raise CypherValidationError("no Cypher query was generated")
+    text = STRING_LITERAL.sub("''", cypher)
+    if WRITE_CLAUSES.search(text):
+        raise CypherValidationError("generated query writes to the database")
+
+    used = set(PARAMETER_PATTERN.findall(text))
+    missing = used - params.keys()
+    if missing:
+        raise CypherValidationError(f"missing parameters: {', '.join(sorted(missing))}")
+    invalid = [name for name in used if not _valid_value(params[name])]
+    if invalid:
+        raise CypherValidationError(f"invalid parameter values: {', '.join(sorted(invalid))}")
+    return {name: params[name] for name in used}
+
+
+def inline_literals(cypher):
+    """Parametre yerine sorguya gömülmüş string literal sayısı (plan cache'i bozar)"""
+    return len(STRING_LITERAL.findall(cypher))
@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+QUOTES = "\"'“”‘’"
+LITERAL_PATTERN = re.compile(r"\"([^\"\\\\]*)\"|'([^'\\\\]*)'")
+QUOTED_ENTITY_PATTERN = re.compile(r"[\"“‘'](.+?)[\"”’']")
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+
+# Sadece slot'lardan oluşan bir kalıp her soruyu eşleştirir; en az bu kadar sabit metin gerekli
+MIN_FIXED_CHARS = 8
+
+# Tırnaksız slot değeri tek bir ad olmalı: bağlaç / ilgi zamiri ya da kalıbın kendi kelimeleri
+# (4+ harfli) geçiyorsa değer sorunun devamını yutmuştur. Her fazladan kelime güveni düşürür.
+MAX_SLOT_LENGTH = 100
+MAX_SLOT_WORDS = 6
+SLOT_WORD_PENALTY = 0.02
+SLOT_STOP_WORDS = {"and", "or", "but", "also", "plus", "then", "that", "which", "who", "whose", "with", "where", "when"}
+
+
+def normalize_question(question):
+    """Boşlukları sadeleştir, sondaki noktalama işaretlerini at (büyük/küçük harf korunur)"""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!").strip()
+
+
+class CypherTemplateCache:
+    """
+    Doğrulanmış soru kalıplarını parametreli Cypher sorgularına eşleyen cache.
+    LLM'in ürettiği ve sonuç döndüren sorgulardaki string literal'ler soruda geçiyorsa
+    parametreye çevrilir; aynı kalıptaki yeni sorularda Cypher üretimi atlanır.
+    """
+
+    def __init__(self, path, threshold=0.9, max_templates=500):
+        self.path = path
+        self.threshold = threshold
+        self.max_templates = max_templates
+        self._lock = threading.Lock()
+        self._templates = self._load()
+        self._compiled = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.learned = 0
+
+    def match(self, question):
+        """Eşleşen kalıp varsa (cypher, params, confidence) döndürür, yoksa None"""
+        question = normalize_question(question)
+        best = None
+
+        with self._lock:
+            templates = list(self._templates)
+
+        for template in templates:
+            # 1) Kalıbın birebir eşleşmesi; güven slot değerlerinin ne kadar ad gibi durduğuna göre
+            matched = self._regex_match(template, question)
+            if matched is not None:
+                values, confidence = matched
+                if confidence >= self.threshold and (best is None or confidence > best[2]):
+                    best = (template, values, confidence)
+                continue
+
+            # 2) Tırnak içindeki varlıklarla yaklaşık eşleşme
+            entities = [m.strip() for m in QUOTED_ENTITY_PATTERN.findall(question)]
+            if len(entities) != len(template["params"]) or not entities:
+                continue
+            skeleton = re.sub(r"\s*\x00\s*", "\x00", QUOTED_ENTITY_PATTERN.sub("\x00", question)).lower()
+            confidence = SequenceMatcher(None, skeleton, "\x00".join(template["parts"]).lower()).ratio()
+            if confidence >= self.threshold and (best is None or confidence > best[2]):
+                best = (template, entities, confidence)
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        template, values, confidence = best
+        template["uses"] = template.get("uses", 0) + 1
+        self.hits += 1
+        return template["cypher"], {**template.get("fixed", {}), **dict(zip(template["params"], values))}, confidence
+
+    def record_fallback(self):
+        """Eşleşen kalıp boş sonuç verdi, LLM'e dönüldü"""
+        self.fallbacks += 1
+
+    def learn(self, question, cypher, context, params=None):
+        """
+        Sonuç döndüren salt-okunur bir sorgudan yeni kalıp çıkar. Değeri soruda
+        geçen parametreler slot olur, geçmeyenler (LIMIT vb.) sabit kalır.
+        """
+        if not cypher or not context or WRITE_CLAUSES.search(cypher):
+            return False
+
+        question = normalize_question(question)
+        lowered = question.lower()
+        fixed = dict(params or {})
+        # Soruda geçen sayı parametreleri (LIMIT 5 gibi) sabit kalıp bir sonraki soruya taşınmasın
+        if any(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            and re.search(rf"\b{re.escape(str(value))}\b", question)
+            for value in fixed.values()
+        ):
+            return False
+
+        # Soruda geçen parametre değerlerini ve literal'leri konumlarına göre bul
+        spans = []
+        for name, value in (params or {}).items():
+            if not isinstance(value, str) or not value.strip():
+                continue
+            index = lowered.find(value.lower())
+            if index < 0 or any(index < end and start < index + len(value) for start, end, _, _ in spans):
+                continue
+            spans.append((index, index + len(value), value, name))
+            fixed.pop(name)
+        for match in LITERAL_PATTERN.finditer(cypher):
+            literal = match.group(1) if match.group(1) is not None else match.group(2)
+            if not literal.strip():
+                continue
+            index = lowered.find(literal.lower())
+            if index < 0 or any(index < end and start < index + len(literal) for start, end, _, _ in spans):
+                continue
+            spans.append((index, index + len(literal), literal, None))
+        spans.sort()
+
+        parts, slots = [], []
+        position = 0
+        for i, (start, end, literal, name) in enumerate(spans):
+            parts.append(question[position:start].strip(QUOTES + " "))
+            position = end
+            if name is None:
+                name = f"slot_{i}"
+                cypher = re.sub(r"([\"'])" + re.escape(literal) + r"\1", "$" + name, cypher)
+            slots.append(name)
+        parts.append(question[position:].strip(QUOTES + " "))
+
+        if len("".join(parts).replace(" ", "")) < MIN_FIXED_CHARS:
+            return False
+
+        template = {"parts": parts, "params": slots, "fixed": fixed, "cypher": cypher, "uses": 0}
+        with self._lock:
+            if any(t["parts"] == parts and t["cypher"] == cypher for t in self._templates):
+                return False
+            self._templates.append(template)
+            # En az kullanılan kalıplar atılır
+            if len(self._templates) > self.max_templates:
+                self._templates.sort(key=lambda t: t.get("uses", 0), reverse=True)
+                del self._templates[self.max_templates:]
+            self.learned += 1
+            self._save()
+        return True
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "templates": len(self._templates),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "learned": self.learned,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _regex_match(self, template, question):
+        key = (tuple(template["parts"]), template["cypher"])
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            slot = "([" + QUOTES + "]?.+?[" + QUOTES + "]?)"
+            pieces = [re.escape(part) for part in template["parts"]]
+            body = (r"\s*" + slot + r"\s*").join(pieces)
+            keywords = {w for part in template["parts"] for w in re.findall(r"\w{4,}", part.lower())}
+            compiled = (re.compile("^" + body + "$", re.IGNORECASE), keywords)
+            self._compiled[key] = compiled
+        regex, keywords = compiled
+        match = regex.match(question)
+        if not match:
+            return None
+
+        values, confidence = [], 1.0
+        for raw in match.groups():
+            value = raw.strip(QUOTES + " ")
+            if not value or len(value) > MAX_SLOT_LENGTH:
+                return None
+            quoted = raw[0] in QUOTES and raw[-1] in QUOTES and len(raw) > 1
+            if not quoted:
+                words = re.findall(r"\w+", value.lower())
+                if len(words) > MAX_SLOT_WORDS or any(w in SLOT_STOP_WORDS or w in keywords for w in words):
+                    return None
+                confidence -= SLOT_WORD_PENALTY * (len(words) - 1)
+            values.append(value)
+        return values, confidence
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._templates, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_neo4j.graphs.graph_store import GraphStore
+
+from tools.cypher_templates import WRITE_CLAUSES
+from tracing import span
+
+STRING_LITERAL = re.compile(r"(\"(?:[^\"\\\\]|\\\\.)*\"|'(?:[^'\\\\]|\\\\.)*')")
+# (n:Label:Other) ve [r:TYPE|OTHER] kalıplarındaki adlar
+NODE_LABELS = re.compile(r"\(\s*\w*\s*((?::\s*`?\w+`?\s*)+)")
+REL_TYPES = re.compile(r"\[\s*\w*\s*:\s*([`\w|:\s]+?)\s*[\]{*]")
+# Tipsiz ilişki (--, -->, -[r]-) ya da prosedür çağrısı: tüm veriye bağlı say
+UNTYPED_PATTERN = re.compile(r"--|-\[\s*\w*\s*[\]{*]|\bCALL\s+[A-Za-z_][\w.]*\s*\(", re.IGNORECASE)
+NONDETERMINISTIC = re.compile(
+    r"\b(rand|randomUUID|timestamp|datetime|date|localdatetime|localtime|time)\s*\(\s*\)", re.IGNORECASE
+)
+# Sohbet geçmişi ve sayaçlar sürekli değişir; bunlara dokunan sorgular cache'lenmez
+UNCACHED_LABELS = {"Session", "Message", "DataVersion"}
+# Düğüm kalıbı: (n), (n:Label), (n {prop: ...}), (n:Label {prop: ...}); fonksiyon çağrısı parantezleri hariç
+NODE_PATTERN = re.compile(r"(?<![\w.`])\(\s*([A-Za-z_]\w*)?\s*(:[^(){}]*)?(\{[^{}]*\})?\s*\)")
+ALL_DATA = "*"
+
+
+def normalize_cypher(cypher):
+    """String literal'ler dışındaki boşlukları sadeleştir, sondaki ';' at"""
+    parts = STRING_LITERAL.split(cypher.strip().rstrip(";"))
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)).strip()
+
+
+def dependencies(cypher):
+    """
+    Sorgunun okuduğu etiket ve ilişki tipleri. Hangi veriye dokunduğu
+    belirlenemiyorsa {"*"}; cache'lenmemesi gerekiyorsa None.
+    """
+    text = STRING_LITERAL.sub("''", cypher)
+    if WRITE_CLAUSES.search(text) or NONDETERMINISTIC.search(text):
+        return None
+
+    labels = set()
+    for match in NODE_LABELS.finditer(text):
+        labels.update(re.findall(r"\w+", match.group(1)))
+    for match in REL_TYPES.finditer(text):
+        labels.update(re.findall(r"\w+", match.group(1)))
+
+    if labels & UNCACHED_LABELS:
+        return None
+    if not labels or UNTYPED_PATTERN.search(text) or _reads_unlabeled_nodes(text):
+        return {ALL_DATA}
+    return labels
+
+
+def _reads_unlabeled_nodes(text):
+    """
+    Etiketsiz bir düğümün özelliği okunuyorsa hangi etikete bağlı olduğu bilinmez:
+    MATCH (g:Game)<-[:PLAYED]-(u) RETURN u.username sorgusu User'a da bağlıdır.
+    """
+    labelled, unlabelled = set(), set()
+    for match in NODE_PATTERN.finditer(text):
+        variable, label, properties = match.groups()
+        if properties and not label:
+            return True
+        if variable:
+            (labelled if label else unlabelled).add(variable)
+    unknown = unlabelled - labelled
+    if not unknown:
+        return False
+    # Kalıpların dışında geçen her kullanım (u.username, RETURN u, count(u)) okuma sayılır
+    outside = NODE_PATTERN.sub("()", text)
+    return any(re.search(rf"\b{re.escape(variable)}\b", outside) for variable in unknown)
+
+
+def _size(value):
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_size(k) + _size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class CypherResultCache:
+    """
+    Normalize edilmiş Cypher + parametreler -> sonuç satırları. Satırlar sütun
+    adları bir kez tutularak tuple olarak saklanır; bayt bütçesi aşılınca en
+    eski kullanılan kayıt çıkarılır. Her kayıt okuduğu etiketlerin sürümünü
+    taşır; sürüm değişmişse kayıt geçersizdir.
+    """
+
+    def __init__(self, versions_fn, max_bytes=32 * 1024 * 1024, max_entries=5000, max_rows=1000, ttl=3600):
+        self.versions_fn = versions_fn
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def key(cypher, params):
+        payload = normalize_cypher(cypher) + "\0" + json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, cypher, params=None):
+        """Geçerli kayıt varsa satırlar (dict listesi), yoksa None"""
+        key = self.key(cypher, params)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expired = self.ttl and time.monotonic() - entry["created_at"] > self.ttl
+        if expired or entry["versions"] != self._snapshot(entry["versions"]):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        self.hits += 1
+        columns = entry["columns"]
+        return [dict(zip(columns, row)) for row in entry["rows"]]
+
+    def put(self, cypher, params, rows, versions=None):
+        """versions: sorgu çalışmadan önce alınmış sürümler (arada yapılan yazma kaybolmasın)"""
+        deps = dependencies(cypher)
+        if deps is None or len(rows) > self.max_rows:
+            self.uncacheable += 1
+            return False
+
+        columns = list(rows[0].keys()) if rows else []
+        packed = tuple(tuple(row.get(c) for c in columns) for row in rows)
+        size = _size(packed) + _size(columns) + len(cypher)
+        if size > self.max_bytes:
+            return False
+
+        key = self.key(cypher, params)
+        entry = {
+            "columns": columns,
+            "rows": packed,
+            "versions": versions if versions is not None else self._snapshot(deps),
+            "size": size,
+            "created_at": time.monotonic(),
+        }
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def query(self, graph, cypher, params=None):
+        """Cache'ten oku, yoksa graph.query ile çalıştırıp sakla"""
+        params = params or {}
+        rows = self.get(cypher, params)
+        if rows is not None:
+            with span("cypher", "cache hit", query=cypher, rows=len(rows)):
+                return rows
+        deps = dependencies(cypher)
+        versions = self._snapshot(deps) if deps is not None else None
+        rows = graph.query(cypher, params)
+        self.put(cypher, params, rows, versions)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "uncacheable": self.uncacheable,
+            }
+
+    def _snapshot(self, deps):
+        """
+        Bağımlılıkların şu anki sürümleri; "*" tüm sayaçların toplamıdır.
+        bump("*") (etiketi bilinmeyen yazmalar) her kaydı geçersizleştirir.
+        """
+        versions = self.versions_fn()
+        if isinstance(deps, dict):
+            deps = deps.keys()
+        everything = versions.get(ALL_DATA, 0)
+        return {
+            dep: sum(versions.values()) if dep == ALL_DATA else versions.get(dep, 0) + everything
+            for dep in deps
+        }
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)["size"]
+
+
+class CachedGraph(GraphStore):
+    """Graph Info sorgularının grafı: okuma sorguları sonuç cache'inden geçer"""
+
+    def __init__(self, graph, cache):
+        self._graph = graph
+        self._cache = cache
+
+    def query(self, query, params={}):
+        return self._cache.query(self._graph, query, params)
+
+    @property
+    def get_schema(self):
+        return self._graph.get_schema
+
+    @property
+    def get_structured_schema(self):
+        return self._graph.get_structured_schema
+
+    def refresh_schema(self):
+        return self._graph.refresh_schema()
+
+    def add_graph_documents(self, graph_documents, include_source=False):
+        return self._graph.add_graph_documents(graph_documents, include_source)
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
@@ -0,0 +1,75 @@
+import json
+
+# Uzun hücreler ve listeler prompt'a tamamen konmaz
+MAX_CELL_LENGTH = 300
+MAX_LIST_ITEMS = 10
+SEPARATOR = " | "
+
+
+def _column_names(columns):
+    """"g.title" -> "title"; kısaltma başka bir sütunla çakışıyorsa tam ad kalır"""
+    short = [c.split(".", 1)[1] if "." in c and "(" not in c else c for c in columns]
+    return [s if short.count(s) == 1 else c for c, s in zip(columns, short)]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        items = [_cell(v) for v in value[:MAX_LIST_ITEMS]]
+        if len(value) > MAX_LIST_ITEMS:
+            # Uzun liste: toplam sayı + ilk örnekler
+            items.append(f"… +{len(value) - MAX_LIST_ITEMS} more ({len(value)} total)")
+        return "[" + ", ".join(items) + "]"
+    if isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    text = str(value).replace("\n", " ").replace("|", "/")
+    return text if len(text) <= MAX_CELL_LENGTH else text[:MAX_CELL_LENGTH] + "…"
+
+
+def encode_rows(rows):
+    """Satırları (başlık, tekrarsız değer satırları, atılan tekrar sayısı) olarak kodla"""
+    columns = []
+    for row in rows:
+        columns.extend(k for k in row if k not in columns)
+
+    lines, seen = [], set()
+    for row in rows:
+        line = SEPARATOR.join(_cell(row.get(c)) for c in columns)
+        if line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return SEPARATOR.join(_column_names(columns)), lines, len(rows) - len(lines)
+
+
+def _render(header, lines, shown, duplicates):
+    notes = [f"{len(lines)} rows"]
+    if duplicates:
+        notes.append(f"{duplicates} duplicate rows removed")
+    if shown < len(lines):
+        notes.append(f"only the first {shown} shown")
+    return "\n".join([f"({', '.join(notes)})", header, *lines[:shown]])
+
+
+def compact_results(rows, count_tokens, token_budget=1500):
+    """
+    Cypher sonuçlarını QA prompt'u için tabloya çevir: sütun adları bir kez
+    başlıkta, her satır tek satır. Bütçeye sığmayan sondaki satırlar atılır
+    (sonuçlar zaten sorgunun sırasıyla geliyor).
+    """
+    if not rows:
+        return "(no rows)"
+    header, lines, duplicates = encode_rows(rows)
+    text = _render(header, lines, len(lines), duplicates)
+    if count_tokens(text) <= token_budget:
+        return text
+
+    # Bütçeye sığan en fazla satır sayısı (ikili arama)
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(_render(header, lines, middle, duplicates)) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return _render(header, lines, max(low, 1), duplicates)
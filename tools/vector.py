@@ -19,62 +19,114 @@ from langchain_neo4j import Neo4jVector
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
+from langchain_core.runnables import RunnableLambda
+from langchain_core.documents import Document
+from tools.answer_cache import SemanticAnswerCache
+from ann_index import AnnIndex, AnnIndexSync
+from tracing import span
+from data_version import get_data_versions
 
-# Create the Neo4jVector
-neo4jvector = Neo4jVector.from_existing_index(
-    embeddings,
-    graph=graph,
-    index_name="gameDescriptions",               # Bu ismin Description düğümü üzerinde oluşturulmuş bir indekse ait olduğundan emin olun
-    node_label="Description",                  # Düğüm etiketi 'Description' olarak değiştirildi
-    text_node_property="text",                 # Metnin bulunduğu özellik 'text' olarak değiştirildi
-    embedding_node_property="embedding",       # Embedding'in bulunduğu özellik (Description düğümünde)
-    retrieval_query="""
+RETRIEVAL_QUERY = """
 // Vektör araması bir 'Description' düğümü bulur, bu düğüme 'node' olarak erişilir.
 // Bu 'node'dan yola çıkarak ilişkili 'Game' düğümünü buluyoruz.
 MATCH (game:Game)-[:HAS_DESCRIPTION]->(node)
 
-// 'game' düğümünü bulduktan sonra, onunla ilgili diğer tüm verileri topluyoruz.
-MATCH (game:Game)-[:HAS_DESCRIPTION]->(node)
-
-// Tüm ilişkili verileri toplama
-OPTIONAL MATCH (game)-[:HAS_TAG]->(t:Tag)
-OPTIONAL MATCH (game)-[:SUPPORTS]->(p:Platform)
-OPTIONAL MATCH (game)<-[:PLAYED]-(u:User)
-OPTIONAL MATCH (game)-[:REVIEWS]->(r:Review)<-[:WROTE_REVIEW]-(reviewer:User)
-
-// Gruplama anahtarlarını açıkça belirtme
-WITH 
-    node, 
-    game, 
-    score,  // score'u burada ekliyoruz
-    collect(DISTINCT t) AS tags_collected,
-    collect(DISTINCT p) AS platforms_collected,
-    collect(DISTINCT u) AS users_collected,
-    collect(DISTINCT {review: r, reviewer: reviewer}) AS reviews_collected
-
-// Aggregasyonları yapma
+// Etiket, platform, oyuncu ve inceleme bilgileri game_summary.py tarafından
+// önceden hesaplanıp Game düğümüne yazılıyor; sorgu anında traversal yapılmıyor.
+// İncelemelerden sadece faydalılık ve yeniliğe göre sıralanmış ilk $review_k tanesi okunuyor.
+CALL {
+    WITH game
+    MATCH (game)-[tr:TOP_REVIEW]->(r:Review)
+    WHERE tr.rank < $review_k
+    OPTIONAL MATCH (reviewer:User)-[:WROTE_REVIEW]->(r)
+    WITH tr, r, reviewer ORDER BY tr.rank
+    RETURN collect({
+        user: reviewer.username,
+        recommended: r.is_recommended,
+        helpful: r.helpful,
+        funny: r.funny,
+        date: r.date
+    }) AS top_reviews
+}
 RETURN
     node.text AS text,
     score,
     {
         name: game.title,
         app_id: game.app_id,
-        tags: [tag IN tags_collected | tag.name],
-        platforms: [platform IN platforms_collected | platform.name],
-        total_players: size(users_collected),
-        reviews: [item IN reviews_collected | {
-            user: item.reviewer.username,
-            recommended: item.review.is_recommended,
-            helpful: item.review.helpful,
-            funny: item.review.funny,
-            date: item.review.date
-        }]
+        tags: coalesce(game.summary_tags, []),
+        platforms: coalesce(game.summary_platforms, []),
+        total_players: coalesce(game.summary_player_count, 0),
+        total_reviews: coalesce(game.summary_review_count, 0),
+        recommended_reviews: coalesce(game.summary_recommended_count, 0),
+        recommended_percent: round(100.0 * game.summary_recommended_ratio, 1),
+        helpful_votes: coalesce(game.summary_helpful_total, 0),
+        top_reviews: top_reviews
     } AS metadata
 """
+
+# Create the Neo4jVector
+neo4jvector = Neo4jVector.from_existing_index(
+    embeddings,
+    graph=graph,
+    index_name="gameDescriptions",               # Bu ismin Description düğümü üzerinde oluşturulmuş bir indekse ait olduğundan emin olun
+    node_label="Description",                  # Düğüm etiketi 'Description' olarak değiştirildi
+    text_node_property="text",                 # Metnin bulunduğu özellik 'text' olarak değiştirildi
+    embedding_node_property="embedding",       # Embedding'in bulunduğu özellik (Description düğümünde)
+    retrieval_query=RETRIEVAL_QUERY
 )
 
-# Create the retriever
-retriever = neo4jvector.as_retriever()
+# Bağlama eklenecek oyun başına inceleme sayısı
+REVIEW_TOP_K = int(st.secrets.get("REVIEW_TOP_K", 3))
+
+# Yerel ANN index: adaylar process içinde bulunur, Neo4j'den sadece ilk k oyunun metadata'sı okunur
+ANN_INDEX_ENABLED = bool(st.secrets.get("ANN_INDEX_ENABLED", False))
+ANN_TOP_K = int(st.secrets.get("ANN_TOP_K", 4))
+
+ANN_FETCH_QUERY = """
+UNWIND $hits AS hit
+MATCH (game:Game {app_id: hit.app_id})-[:HAS_DESCRIPTION]->(node:Description)
+WITH game, node, hit.score AS score
+""" + RETRIEVAL_QUERY
+
+ann_index = None
+if ANN_INDEX_ENABLED:
+    ann_index = AnnIndex(
+        st.secrets.get("ANN_INDEX_DIR", os.path.join(project_root, ".cache", "ann_index")),
+        n_probe=int(st.secrets.get("ANN_INDEX_PROBES", 8)),
+    )
+    ann_index.load()
+    AnnIndexSync(
+        ann_index, graph._driver, graph._database,
+        interval=int(st.secrets.get("ANN_INDEX_SYNC_INTERVAL", 60)),
+    ).start()
+
+
+def vector_search(embedding, query):
+    """ANN index hazırsa yerel arama + toplu metadata okuma, değilse Neo4j vektör index'i"""
+    hits = []
+    if ann_index is not None:
+        with span("vector_search", "ann index", k=ANN_TOP_K) as attrs:
+            hits = ann_index.search(embedding, k=ANN_TOP_K)
+            attrs["rows"] = len(hits)
+    if not hits:
+        with span("vector_search", "neo4j index", k=ANN_TOP_K) as attrs:
+            documents = neo4jvector.similarity_search_by_vector(
+                embedding, k=ANN_TOP_K, query=query, params={"review_k": REVIEW_TOP_K}
+            )
+            attrs["rows"] = len(documents)
+            return documents
+
+    records = graph.query(ANN_FETCH_QUERY, {
+        "hits": [{"app_id": app_id, "score": score} for app_id, score in hits],
+        "review_k": REVIEW_TOP_K,
+    })
+    records.sort(key=lambda r: r["score"], reverse=True)
+    return [Document(page_content=r["text"], metadata=r["metadata"]) for r in records]
+
+
+# Cache'te hesaplanan embedding tekrar kullanılıyor, ikinci bir embedding çağrısı yapılmıyor
+embedding_retriever = RunnableLambda(lambda x: vector_search(x["embedding"], x["input"]))
 
 instructions = (
     "You are an assistant answering questions about video games based on the provided context."
@@ -97,11 +149,40 @@ prompt = ChatPromptTemplate.from_messages(
 # Create the chain
 question_answer_chain = create_stuff_documents_chain(llm, prompt)
 game_qa_chain = create_retrieval_chain(
-    retriever,               # Neo4jVector retriever
+    embedding_retriever,     # Neo4jVector araması (hazır embedding ile)
     question_answer_chain    # LLM + Prompt zinciri
 )
+
+
+# Cevapların dayandığı veriler: açıklamalar/embedding'ler, oyun özetleri ve öne çıkan incelemeler
+ANSWER_DEPENDENCIES = ("Description", "HAS_DESCRIPTION", "Game", "TOP_REVIEW", "Review", "*")
+
+
+def get_index_fingerprint():
+    """Cevapların dayandığı etiketlerin :DataVersion sayaçları (Neo4j'de tarama yapmaz)"""
+    versions = get_data_versions().current()
+    return tuple(versions.get(label, 0) for label in ANSWER_DEPENDENCIES)
+
+
+# Benzer sorular için cevap cache'i
+answer_cache = SemanticAnswerCache(
+    embeddings.embed_query,
+    threshold=float(st.secrets.get("ANSWER_CACHE_THRESHOLD", 0.95)),
+    max_entries=int(st.secrets.get("ANSWER_CACHE_MAX_ENTRIES", 1000)),
+    max_bytes=int(st.secrets.get("ANSWER_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    ttl=int(st.secrets.get("ANSWER_CACHE_TTL", 3600)),
+    fingerprint_fn=get_index_fingerprint,
+    fingerprint_interval=float(st.secrets.get("ANSWER_CACHE_CHECK_INTERVAL", 2.0)),
+)
+
+
 # Create a function to call the chain
 def get_game_info(user_input):
-    response = game_qa_chain.invoke({"input": user_input})
+    cached_answer, embedding = answer_cache.lookup(user_input)
+    if cached_answer is not None:
+        return cached_answer
+
+    response = game_qa_chain.invoke({"input": user_input, "embedding": embedding.tolist()})
+    answer_cache.store(user_input, embedding, response['answer'])
 
     return response['answer']
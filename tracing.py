@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from startup import lazy
+
+logger = logging.getLogger(__name__)
+
+# İstek boyunca aktif iz; LangChain her callback manager'a bu handler'ı kendisi ekler,
+# böylece fast path ve planlayıcıdaki config'siz zincir çağrıları da izlenir
+_current_trace = ContextVar("nextlevelbot_trace", default=None)
+register_configure_hook(_current_trace, inheritable=True)
+
+DEFAULT_TRACE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "traces.jsonl")
+
+# Dışa aktarımda uzun alanlar kırpılır
+MAX_TEXT_LENGTH = 2000
+MAX_PARAMS_LENGTH = 2000
+
+
+def _clip(text, limit=MAX_TEXT_LENGTH):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def loggable_params(params):
+    """Parametreler ize yazılabilecek kadar küçükse JSON uyumlu kopyası, değilse None"""
+    try:
+        text = json.dumps(params or {}, default=str)
+    except (TypeError, ValueError):
+        return None
+    return json.loads(text) if len(text) <= MAX_PARAMS_LENGTH else None
+
+
+def trace_log_path():
+    return st.secrets.get("TRACE_LOG_PATH", DEFAULT_TRACE_LOG)
+
+
+class Trace(BaseCallbackHandler):
+    """
+    Tek bir isteğin span listesi. Aynı zamanda LLM, araç ve agent olaylarını
+    span olarak kaydeden LangChain callback'i.
+    """
+
+    def __init__(self, question, session_id=None):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.question = question
+        self.session_id = session_id
+        self.path = None
+        self.error = None
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = []
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._iteration = 0
+        self._iteration_started = self._started
+
+    def add_span(self, kind, name, started, duration, **attrs):
+        with self._lock:
+            self.spans.append({
+                "kind": kind,
+                "name": name,
+                "offset_ms": (started - self._started) * 1000,
+                "duration_ms": duration * 1000,
+                **attrs,
+            })
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = str(error)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["offset_ms"])
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "question": self.question,
+            "path": self.path,
+            "error": self.error,
+            "started_at": self.started_at,
+            "duration_ms": (self.duration or 0.0) * 1000,
+            "llm_calls": sum(s["kind"] == "llm" for s in spans),
+            "prompt_tokens": sum(s.get("prompt_tokens") or 0 for s in spans),
+            "completion_tokens": sum(s.get("completion_tokens") or 0 for s in spans),
+            "spans": spans,
+        }
+
+    # LangChain callback'leri
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        self._runs[run_id] = (time.perf_counter(), name)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        self._runs[run_id] = (time.perf_counter(), name)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, name = self._runs.pop(run_id, (None, "llm"))
+        if started is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        # Akışlı çağrılarda kullanım bilgisi mesajın usage_metadata'sında gelir
+        if prompt_tokens is None:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if metadata:
+                        prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                        completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+        self.add_span("llm", name, started, time.perf_counter() - started,
+                      prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started, name = self._runs.pop(run_id, (None, "llm"))
+        if started is not None:
+            self.add_span("llm", name, started, time.perf_counter() - started, error=_clip(error, 300))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._runs[run_id] = (time.perf_counter(), (serialized or {}).get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        started, name = self._runs.pop(run_id, (None, "tool"))
+        if started is not None:
+            self.add_span("tool", name, started, time.perf_counter() - started)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        started, name = self._runs.pop(run_id, (None, "tool"))
+        if started is not None:
+            self.add_span("tool", name, started, time.perf_counter() - started, error=_clip(error, 300))
+
+    def on_agent_action(self, action, *, run_id, **kwargs):
+        # Bir iterasyon: önceki adımın sonundan bu aksiyona kadar (LLM kararı dahil)
+        self._end_iteration(tool=action.tool, tool_input=_clip(action.tool_input, 300))
+
+    def on_agent_finish(self, finish, *, run_id, **kwargs):
+        self._end_iteration(final=True)
+
+    def _end_iteration(self, **attrs):
+        now = time.perf_counter()
+        with self._lock:
+            self._iteration += 1
+            iteration, started = self._iteration, self._iteration_started
+            self._iteration_started = now
+        self.add_span("agent", f"iteration {iteration}", started, now - started, **attrs)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(kind, name, **attrs):
+    """
+    Aktif iz varsa bloğun süresini span olarak ekler. Dönen sözlüğe
+    blok içinde ek alanlar (satır sayısı vb.) yazılabilir.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = _clip(e, 300)
+        raise
+    finally:
+        trace.add_span(kind, name, started, time.perf_counter() - started, **attrs)
+
+
+def traced(kind, name, fn):
+    """Fonksiyonu her çağrıda span kaydedecek şekilde sarmala"""
+    def wrapper(*args, **kwargs):
+        with span(kind, name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class Tracer:
+    """
+    Biten izleri toplar: son N iz (genel ve oturum başına), aşama bazında
+    süre örnekleri ve isteğe bağlı JSONL dışa aktarımı.
+    """
+
+    def __init__(self, max_traces=50, max_sessions=1000, max_samples=2000,
+                 export_path=None, max_export_bytes=50 * 1024 * 1024):
+        self.max_traces = max_traces
+        self.max_sessions = max_sessions
+        self.export_path = export_path
+        self.max_export_bytes = max_export_bytes
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._recent = deque(maxlen=max_traces)
+        self._sessions = OrderedDict()
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self.exported = 0
+        self.export_errors = 0
+
+    def add(self, trace):
+        data = trace.to_dict()
+        with self._lock:
+            self._recent.append(data)
+            session = self._sessions.pop(data["session_id"], None) or deque(maxlen=self.max_traces)
+            session.append(data)
+            self._sessions[data["session_id"]] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+            self._samples["request"].append(data["duration_ms"])
+            for s in data["spans"]:
+                stage = f"tool: {s['name']}" if s["kind"] == "tool" else s["kind"]
+                self._samples[stage].append(s["duration_ms"])
+
+        if self.export_path:
+            self._export(data)
+        logger.debug("trace %s: %s in %.0f ms, %d spans",
+                     data["trace_id"], data["path"], data["duration_ms"], len(data["spans"]))
+        return data
+
+    def recent(self, session_id=None, limit=None):
+        """En yeni önce; session_id verilirse sadece o oturumun izleri"""
+        with self._lock:
+            traces = list(self._sessions.get(session_id, ())) if session_id else list(self._recent)
+        traces.reverse()
+        return traces[:limit] if limit else traces
+
+    def stage_stats(self):
+        with self._lock:
+            samples = {stage: np.asarray(values) for stage, values in self._samples.items() if values}
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max()),
+            }
+            for stage, values in sorted(samples.items())
+        }
+
+    def _export(self, data):
+        line = json.dumps(data, ensure_ascii=False, default=str) + "\n"
+        with self._export_lock:
+            try:
+                os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+                # Dosya büyüdüyse bir önceki dosyanın üzerine döndür
+                if os.path.exists(self.export_path) and os.path.getsize(self.export_path) > self.max_export_bytes:
+                    os.replace(self.export_path, self.export_path + ".1")
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self.exported += 1
+            except OSError as e:
+                self.export_errors += 1
+                logger.warning("trace export failed: %s", e)
+
+
+@lazy("tracer")
+def get_tracer():
+    export = st.secrets.get("TRACE_EXPORT", True)
+    return Tracer(
+        max_traces=int(st.secrets.get("TRACE_MAX_TRACES", 50)),
+        export_path=trace_log_path() if export else None,
+    )
+
+
+@contextmanager
+def trace(question, session_id=None):
+    """
+    Bloğun içindeki tüm LLM/araç/Cypher/embedding çağrılarını tek bir ize toplar
+    ve blok bitince izi tracer'a ekler.
+    """
+    current = Trace(question, session_id)
+    token = _current_trace.set(current)
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _current_trace.reset(token)
+        current.finish(error)
+        try:
+            get_tracer().add(current)
+        except Exception as e:
+            logger.warning("could not record trace: %s", e)
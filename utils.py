@@ -1,6 +1,12 @@
 import streamlit as st
 from streamlit.runtime.scriptrunner.script_run_context import get_script_run_ctx
 
+def save_message(role, content):
+    """
+    Saves a message to the session state without writing it to the UI
+    """
+    st.session_state.messages.append({"role": role, "content": content})
+
 def write_message(role, content, save = True):
     """
     This is a helper function that saves a message to the
@@ -8,7 +14,7 @@ def write_message(role, content, save = True):
     """
     # Append to session state
     if save:
-        st.session_state.messages.append({"role": role, "content": content})
+        save_message(role, content)
 
     # Write to UI
     with st.chat_message(role):